@@ -7,144 +7,68 @@ Analyzes voting patterns across:
 3. Grossregionen der Schweiz (Regional)
 
 For all 223 proposals (2000-2025)
+
+Welch's ANOVA and Kruskal-Wallis (robust to the unbalanced groups) are
+written to anova_results_robust.csv in the same schema. A two-way ANOVA
+Sprachgebiet × Stadt-Land with interaction (Type II/III) goes to
+anova_results_twoway.csv, pairwise post-hoc comparisons (Tukey HSD and
+Games-Howell) to anova_posthoc.csv. Group n/mean/std per proposal (used by
+anova_visualizations.py) go to anova_group_stats.csv.
+
+Municipalities differ by orders of magnitude in size, so the ANOVA is also
+reported weighted by electorate (WEIGHT_COL): *_weighted columns and
+weighted group means/stds, computed in the same pass as the unweighted ones.
+
+Optional permutation p-values (ja_prozent is often non-normal):
+    python anova_analysis.py --permutations 10000
 """
 
-import sqlite3
 import pandas as pd
-import numpy as np
-from scipy import stats
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
-# Database connection
-DB_PATH = '/home/jonas/ffhs-stats-project-local/data/processed/swiss_votings.db'
-
-def load_data():
-    """Load voting data with municipality features"""
-    conn = sqlite3.connect(DB_PATH)
-
-    query = """
-    SELECT
-        v.municipality_id,
-        v.municipality_name,
-        v.voting_date,
-        v.proposal_id,
-        v.title_de,
-        v.ja_prozent,
-        v.stimmbeteiligung,
-        mf.sprachgebiete,
-        mf.staedtische_laendliche_gebiete,
-        mf.grossregionen_der_schweiz
-    FROM v_voting_results_analysis v
-    INNER JOIN municipality_features mf ON v.municipality_id = mf.bfs_nr
-    WHERE v.ja_prozent IS NOT NULL
-    """
-
-    df = pd.read_sql_query(query, conn)
-
-    # Load labels
-    labels_query = """
-    SELECT feature_name, code, label
-    FROM feature_labels
-    WHERE feature_name IN ('sprachgebiete', 'staedtische_laendliche_gebiete', 'grossregionen_der_schweiz')
-    """
-    labels_df = pd.read_sql_query(labels_query, conn)
-    conn.close()
-
-    # Create label mappings
-    label_maps = {}
-    for feature in ['sprachgebiete', 'staedtische_laendliche_gebiete', 'grossregionen_der_schweiz']:
-        feature_labels = labels_df[labels_df['feature_name'] == feature]
-        label_maps[feature] = dict(zip(feature_labels['code'], feature_labels['label']))
-
-    return df, label_maps
-
-
-def calculate_eta_squared(df, group_col, value_col):
-    """Calculate eta-squared (effect size) for ANOVA"""
-    groups = [group[value_col].values for name, group in df.groupby(group_col)]
-
-    # Total sum of squares
-    grand_mean = df[value_col].mean()
-    ss_total = ((df[value_col] - grand_mean) ** 2).sum()
-
-    # Between-group sum of squares
-    ss_between = sum(len(g) * (g.mean() - grand_mean) ** 2 for g in groups)
-
-    # Eta-squared
-    eta_sq = ss_between / ss_total if ss_total > 0 else 0
-    return eta_sq
-
-
-def run_anova_for_proposal(df, proposal_id, group_col):
-    """Run ANOVA for a single proposal and grouping variable"""
-    proposal_data = df[df['proposal_id'] == proposal_id].copy()
-
-    # Remove NaN values
-    proposal_data = proposal_data.dropna(subset=[group_col, 'ja_prozent'])
+from anova_data import OUTPUT_DIR, load_analysis_data
+from anova_engine import encode, group_statistics, group_stats_table, oneway_anova, permutation_pvalues, twoway_anova
+from anova_posthoc import posthoc
 
-    # Get groups
-    groups = [group['ja_prozent'].values for name, group in proposal_data.groupby(group_col)]
+# Seed for the permutation RNG streams (one stream per proposal)
+PERMUTATION_SEED = 20000312
 
-    # Need at least 2 groups with data
-    groups = [g for g in groups if len(g) > 0]
-    if len(groups) < 2:
-        return None
+# Weights for the weighted ANOVA (or 'gueltige_stimmen')
+WEIGHT_COL = 'anzahl_stimmberechtigte'
 
-    # Run ANOVA
-    try:
-        f_stat, p_value = stats.f_oneway(*groups)
-
-        # Calculate effect size (eta-squared)
-        eta_sq = calculate_eta_squared(proposal_data, group_col, 'ja_prozent')
-
-        # Calculate group means
-        group_means = proposal_data.groupby(group_col)['ja_prozent'].agg(['mean', 'std', 'count'])
-
-        # Get proposal info
-        title = proposal_data['title_de'].iloc[0]
-        voting_date = proposal_data['voting_date'].iloc[0]
-
-        # Calculate range (max - min mean)
-        mean_range = group_means['mean'].max() - group_means['mean'].min()
-
-        return {
-            'proposal_id': proposal_id,
-            'title': title,
-            'voting_date': voting_date,
-            'f_statistic': f_stat,
-            'p_value': p_value,
-            'eta_squared': eta_sq,
-            'mean_range': mean_range,
-            'n_municipalities': len(proposal_data),
-            'n_groups': len(groups),
-            'group_means': group_means.to_dict()
-        }
-    except Exception as e:
-        return None
-
-
-def run_all_anova(df, group_col, group_name):
-    """Run ANOVA for all proposals"""
-    proposals = df['proposal_id'].unique()
-    results = []
-
-    print(f"\nRunning ANOVA for {group_name} ({len(proposals)} proposals)...")
-
-    for i, proposal_id in enumerate(proposals):
-        result = run_anova_for_proposal(df, proposal_id, group_col)
-        if result:
-            result['category'] = group_name
-            results.append(result)
+def run_all_anova(df, group_col, group_name, n_permutations=0, method='anova', codes=None, statistics=None):
+    """
+    Run ANOVA for all proposals (vectorized, see anova_engine.py).
 
-        if (i + 1) % 50 == 0:
-            print(f"  Processed {i + 1}/{len(proposals)} proposals...")
+    codes (encoded with WEIGHT_COL) and their group_statistics() can be
+    passed in to share them with the other passes over the same grouping.
+    """
+    print(f"\nRunning {method} for {group_name} ({df['proposal_id'].nunique()} proposals)...")
 
-    results_df = pd.DataFrame(results)
+    if codes is None:
+        codes = encode(df, group_col, 'ja_prozent', weight_col=WEIGHT_COL)
+    # Weighted variant only for the classic ANOVA
+    if method != 'anova':
+        codes = {**codes, 'weights': None}
+    results_df = oneway_anova(df, group_col, 'ja_prozent', codes=codes, method=method, statistics=statistics)
+    results_df['category'] = group_name
 
     # Add significance flag
     results_df['significant'] = results_df['p_value'] < 0.05
     results_df['highly_significant'] = results_df['p_value'] < 0.001
+    results_df['method'] = method
+
+    # Rank by effect size among the significant proposals (the top lists)
+    rank = results_df['eta_squared'].where(results_df['significant']).rank(ascending=False, method='first')
+    results_df['rank'] = rank.astype('Int64')
+
+    # Distribution-free p-values from shuffled group labels
+    if n_permutations > 0:
+        print(f"  Permutation test with {n_permutations:,} permutations per proposal...")
+        p_perm = permutation_pvalues(codes, n_permutations, seed=PERMUTATION_SEED)
+        results_df['p_permutation'] = results_df['proposal_id'].map(pd.Series(p_perm, index=codes['proposals']))
 
     return results_df
 
@@ -169,7 +93,7 @@ def main():
 
     # Load data
     print("\nLoading data...")
-    df, label_maps = load_data()
+    df, label_maps = load_analysis_data()
     print(f"Loaded {len(df):,} voting records")
     print(f"Unique proposals: {df['proposal_id'].nunique()}")
     print(f"Unique municipalities: {df['municipality_id'].nunique()}")
@@ -181,11 +105,18 @@ def main():
         ('grossregionen_der_schweiz', 'Grossregionen'),
     ]
 
+    n_permutations = int(sys.argv[sys.argv.index('--permutations') + 1]) if '--permutations' in sys.argv else 0
+
+    # Encoded rows and cell statistics per grouping, shared by all passes below
+    encoded = {group_col: encode(df, group_col, 'ja_prozent', weight_col=WEIGHT_COL) for group_col, _ in analyses}
+    cell_statistics = {group_col: group_statistics(codes) for group_col, codes in encoded.items()}
+
     all_results = []
 
     # Run ANOVA for each category
     for group_col, group_name in analyses:
-        results_df = run_all_anova(df, group_col, group_name)
+        results_df = run_all_anova(df, group_col, group_name, n_permutations,
+                                   codes=encoded[group_col], statistics=cell_statistics[group_col])
         all_results.append(results_df)
 
         # Summary statistics
@@ -197,15 +128,78 @@ def main():
         print(f"  Significant (p < 0.05): {n_significant} ({100*n_significant/len(results_df):.1f}%)")
         print(f"  Highly significant (p < 0.001): {n_highly_sig} ({100*n_highly_sig/len(results_df):.1f}%)")
         print(f"  Mean eta-squared: {results_df['eta_squared'].mean():.4f}")
+        if 'eta_squared_weighted' in results_df:
+            n_weighted_sig = (results_df['p_value_weighted'] < 0.05).sum()
+            print(f"  Weighted by {WEIGHT_COL}: significant {n_weighted_sig}, "
+                  f"mean eta-squared {results_df['eta_squared_weighted'].mean():.4f}")
+        if 'p_permutation' in results_df:
+            n_perm_sig = (results_df['p_permutation'] < 0.05).sum()
+            print(f"  Significant by permutation test (p < 0.05): {n_perm_sig} ({100*n_perm_sig/len(results_df):.1f}%)")
 
     # Combine all results
     combined_results = pd.concat(all_results, ignore_index=True)
 
     # Save full results
-    output_path = '/home/jonas/ffhs-stats-project-local/5_ANOVA/anova_results_full.csv'
+    output_path = OUTPUT_DIR / 'anova_results_full.csv'
     combined_results.drop(columns=['group_means']).to_csv(output_path, index=False)
     print(f"\nFull results saved to: {output_path}")
 
+    # Group statistics per proposal, so plots need no groupby over the raw rows
+    group_stats = pd.concat([
+        group_stats_table(encoded[group_col], cell_statistics[group_col]).assign(
+            category=group_name, grouping=group_col,
+            label=lambda table: table['group'].map(label_maps[group_col]))
+        for group_col, group_name in analyses
+    ], ignore_index=True)
+    group_stats = group_stats[['category', 'grouping', 'proposal_id', 'group', 'label', 'n', 'mean', 'std',
+                               'mean_weighted', 'std_weighted']]
+
+    group_stats_path = OUTPUT_DIR / 'anova_group_stats.csv'
+    group_stats.to_csv(group_stats_path, index=False)
+    print(f"Group statistics saved to: {group_stats_path}")
+
+    # Robust variants for the unbalanced groupings, same schema with method column
+    robust_results = [
+        run_all_anova(df, group_col, group_name, method=method,
+                      codes=encoded[group_col], statistics=cell_statistics[group_col])
+        for method in ('welch', 'kruskal')
+        for group_col, group_name in analyses
+    ]
+    robust_combined = pd.concat(robust_results, ignore_index=True)
+    for (method, category), group in robust_combined.groupby(['method', 'category'], sort=False):
+        print(f"  {method} / {category}: {group['significant'].sum()} of {len(group)} significant (p < 0.05)")
+
+    robust_path = OUTPUT_DIR / 'anova_results_robust.csv'
+    robust_combined.drop(columns=['group_means']).to_csv(robust_path, index=False)
+    print(f"Robust results saved to: {robust_path}")
+
+    # Two-way ANOVA: language and urbanity effects separated, with interaction
+    print("\nRunning two-way ANOVA Sprachgebiete × Stadt-Land...")
+    twoway = twoway_anova(df, 'sprachgebiete', 'staedtische_laendliche_gebiete')
+    for term, group in twoway[twoway['term'] != 'residual'].groupby('term', sort=False):
+        n_sig = (group['p_type3'] < 0.05).sum()
+        print(f"  {term}: significant (Type III, p < 0.05) in {n_sig} of {len(group)} proposals, "
+              f"mean partial eta² {group['partial_eta_squared'].mean():.4f}")
+
+    twoway_path = OUTPUT_DIR / 'anova_results_twoway.csv'
+    twoway.to_csv(twoway_path, index=False)
+    print(f"Two-way results saved to: {twoway_path}")
+
+    # Post-hoc: which groups differ, per proposal and grouping
+    print("\nRunning post-hoc comparisons (Tukey HSD, Games-Howell)...")
+    posthoc_results = pd.concat([
+        posthoc(df, group_col, 'ja_prozent', method=method,
+                codes=encoded[group_col], statistics=cell_statistics[group_col])
+        for group_col, _ in analyses
+        for method in ('tukey', 'games-howell')
+    ], ignore_index=True)
+    for (grouping, method), group in posthoc_results.groupby(['grouping', 'method'], sort=False):
+        print(f"  {grouping} / {method}: {(group['p_adj'] < 0.05).sum()} of {len(group)} pairs differ (p_adj < 0.05)")
+
+    posthoc_path = OUTPUT_DIR / 'anova_posthoc.csv'
+    posthoc_results.to_csv(posthoc_path, index=False)
+    print(f"Post-hoc results saved to: {posthoc_path}")
+
     # Print top 15 per category
     print("\n" + "=" * 80)
     print("TOP 15 ABSTIMMUNGEN MIT GRÖSSTEN SIGNIFIKANTEN UNTERSCHIEDEN")
@@ -231,6 +225,9 @@ def main():
             print(f"    Datum: {row['voting_date']} | ID: {row['proposal_id']}")
             print(f"    F = {row['f_statistic']:.1f} | p = {row['p_value']:.2e} | eta² = {row['eta_squared']:.4f}")
             print(f"    Differenz (max-min): {row['mean_range']:.1f} Prozentpunkte")
+            if 'eta_squared_weighted' in row:
+                print(f"    Gewichtet: F = {row['f_statistic_weighted']:.1f} | eta² = {row['eta_squared_weighted']:.4f}"
+                      f" | Differenz {row['mean_range_weighted']:.1f} Prozentpunkte")
             print(f"    {format_group_means(row['group_means'], label_maps[group_col])}")
 
     # Create summary table
@@ -256,7 +253,7 @@ def main():
     print(summary_df.to_string(index=False))
 
     # Save summary
-    summary_path = '/home/jonas/ffhs-stats-project-local/5_ANOVA/anova_summary.csv'
+    summary_path = OUTPUT_DIR / 'anova_summary.csv'
     summary_df.to_csv(summary_path, index=False)
     print(f"\nSummary saved to: {summary_path}")
 
@@ -0,0 +1,137 @@
+"""
+Shared Analysis Dataset
+=======================
+One loader for anova_analysis.py, anova_visualizations.py and the notebook.
+
+The join v_voting_results_analysis ⨝ municipality_features is materialized
+once as a Parquet snapshot (text columns as categoricals) together with the
+feature labels. Later calls read the snapshot until the database changes:
+the snapshot key covers the schema version and a content checksum of every
+source table (scripts/db_version.py) plus the selected feature columns.
+
+Paths (environment variables, defaults relative to the repository):
+- SWISS_VOTINGS_DB: database, default data/processed/swiss_votings.db
+- ANOVA_OUTPUT_DIR: result tables and figures, default this directory
+- ANALYSIS_CACHE_DIR: snapshots, default data/cache/analysis
+
+    from anova_data import load_analysis_data
+    df, label_maps = load_analysis_data()
+"""
+
+import sqlite3
+import pandas as pd
+from pathlib import Path
+import hashlib
+import json
+import os
+import sys
+
+# Content version of the source tables, shared with scripts/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+from db_version import data_version
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = Path(os.environ.get('SWISS_VOTINGS_DB', PROJECT_DIR / 'data' / 'processed' / 'swiss_votings.db'))
+OUTPUT_DIR = Path(os.environ.get('ANOVA_OUTPUT_DIR', Path(__file__).resolve().parent))
+CACHE_DIR = Path(os.environ.get('ANALYSIS_CACHE_DIR', PROJECT_DIR / 'data' / 'cache' / 'analysis'))
+
+# Bump when the query or the snapshot layout changes
+SNAPSHOT_VERSION = 1
+
+# Tables behind v_voting_results_analysis and the features
+SOURCE_TABLES = ('votings', 'proposals', 'voting_results', 'municipal_changes',
+                 'municipality_features', 'feature_labels')
+
+ANALYSIS_FEATURES = ('sprachgebiete', 'staedtische_laendliche_gebiete', 'grossregionen_der_schweiz')
+
+CATEGORICAL_COLUMNS = ('municipality_name', 'voting_date', 'title_de')
+
+
+def snapshot_key(conn, features):
+    """Key of the snapshot for the current database content and feature selection"""
+    payload = json.dumps(
+        {'snapshot': SNAPSHOT_VERSION, 'data': data_version(conn, SOURCE_TABLES), 'features': list(features)},
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+def query_analysis_data(conn, features):
+    """Run the join and load the labels of the selected features"""
+    feature_columns = ''.join(f',\n        mf.{feature}' for feature in features)
+    query = f"""
+    SELECT
+        v.municipality_id,
+        v.municipality_name,
+        v.voting_date,
+        v.proposal_id,
+        v.title_de,
+        v.ja_prozent,
+        v.stimmbeteiligung,
+        v.anzahl_stimmberechtigte,
+        v.gueltige_stimmen{feature_columns}
+    FROM v_voting_results_analysis v
+    INNER JOIN municipality_features mf ON v.municipality_id = mf.bfs_nr
+    WHERE v.ja_prozent IS NOT NULL
+    """
+    df = pd.read_sql_query(query, conn)
+    for col in CATEGORICAL_COLUMNS:
+        df[col] = df[col].astype('category')
+
+    placeholders = ', '.join('?' * len(features))
+    labels = pd.read_sql_query(
+        f"SELECT feature_name, code, label FROM feature_labels WHERE feature_name IN ({placeholders})",
+        conn, params=list(features)
+    )
+    return df, labels
+
+
+def label_maps_from(labels, features):
+    """{feature: {code: label}} for every selected feature"""
+    maps = {feature: {} for feature in features}
+    for feature, group in labels.groupby('feature_name', sort=False):
+        maps[feature] = dict(zip(group['code'], group['label']))
+    return maps
+
+
+def load_analysis_data(features=ANALYSIS_FEATURES, db_path=None, cache_dir=None, refresh=False):
+    """
+    Voting records joined with the selected features, and their label maps.
+
+    Served from the snapshot in cache_dir while the database is unchanged;
+    refresh=True rebuilds it.
+    """
+    features = tuple(features)
+    cache_dir = Path(cache_dir or CACHE_DIR)
+
+    conn = sqlite3.connect(db_path or DB_PATH)
+    try:
+        key = snapshot_key(conn, features)
+        data_path = cache_dir / f'analysis_{key}.parquet'
+        labels_path = cache_dir / f'analysis_{key}_labels.parquet'
+
+        if not refresh and data_path.exists() and labels_path.exists():
+            df = pd.read_parquet(data_path)
+            labels = pd.read_parquet(labels_path)
+        else:
+            df, labels = query_analysis_data(conn, features)
+            store_snapshot(df, labels, data_path, labels_path)
+    finally:
+        conn.close()
+
+    return df, label_maps_from(labels, features)
+
+
+def store_snapshot(df, labels, data_path, labels_path):
+    """Write the snapshot files (via temp files) and drop stale snapshots"""
+    cache_dir = data_path.parent
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    for frame, path in ((labels, labels_path), (df, data_path)):
+        tmp_path = path.with_suffix('.tmp')
+        frame.to_parquet(tmp_path, index=False)
+        tmp_path.replace(path)
+
+    for path in cache_dir.glob('analysis_*.parquet'):
+        if path not in (data_path, labels_path):
+            path.unlink(missing_ok=True)
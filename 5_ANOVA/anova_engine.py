@@ -0,0 +1,566 @@
+"""
+Vectorized ANOVA Engine
+=======================
+One-way ANOVA for all proposals at once.
+
+The (proposal, group, value) rows are integer-coded once; counts, sums and
+within-group sums of squares per (proposal, group) cell then come from
+np.bincount over the flat cell index. F, p, eta², group means/stds and mean
+ranges are derived from these (proposals × groups) arrays for every proposal
+simultaneously, instead of filtering the DataFrame per proposal.
+
+The within-group sums of squares are computed in a second pass on values
+centered at their cell mean, which avoids the cancellation of the
+sum(x²) - n·mean² shortcut.
+
+With weight_col (e.g. anzahl_stimmberechtigte) oneway_anova() also reports
+the weighted (WLS) ANOVA and electorate-weighted group means/stds from the
+same coded arrays.
+
+Besides the classic F-test, oneway_anova() offers Welch's ANOVA (unequal
+variances, from the same cell statistics) and Kruskal-Wallis (ranks from one
+segmented sort over all proposals) for the unbalanced groupings.
+
+permutation_pvalues() adds a distribution-free p-value per proposal by
+shuffling the values against the fixed group labels in batches.
+
+twoway_anova() fits factor A, factor B and their interaction with Type II
+and Type III sums of squares. Proposals sharing the same set of observed
+municipalities share one design matrix, so each set is solved once with all
+its proposals as right-hand-side columns.
+"""
+
+import pandas as pd
+import numpy as np
+from scipy import stats
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+METHODS = ('anova', 'welch', 'kruskal')
+
+# Permutations evaluated per matrix operation
+PERMUTATION_BATCH_SIZE = 1000
+
+
+def encode(df, group_col, value_col='ja_prozent', proposal_col='proposal_id', weight_col=None):
+    """
+    Integer-code the (proposal, group, value) rows of df.
+
+    Rows with a missing group or value are dropped. Proposals keep their order
+    of first appearance, groups are sorted. Missing weights count as 0.
+    """
+    data = df.dropna(subset=[group_col, value_col])
+    proposal_idx, proposals = pd.factorize(data[proposal_col], sort=False)
+    group_idx, groups = pd.factorize(data[group_col], sort=True)
+
+    return {
+        'data': data,
+        'proposal_idx': proposal_idx,
+        'group_idx': group_idx,
+        'values': data[value_col].to_numpy(dtype=float),
+        'weights': np.nan_to_num(data[weight_col].to_numpy(dtype=float)) if weight_col else None,
+        'proposals': np.asarray(proposals),
+        'groups': np.asarray(groups),
+    }
+
+
+def cell_index(codes):
+    """Flat (proposal, group) cell index of every row."""
+    return codes['proposal_idx'] * len(codes['groups']) + codes['group_idx']
+
+
+def group_statistics(codes):
+    """
+    Per-(proposal, group) counts, means and within-cell sums of squares.
+
+    Returns three arrays of shape (n_proposals, n_groups); means are NaN for
+    empty cells.
+    """
+    shape = (len(codes['proposals']), len(codes['groups']))
+    cell = cell_index(codes)
+    values = codes['values']
+
+    counts = np.bincount(cell, minlength=shape[0] * shape[1])
+    sums = np.bincount(cell, weights=values, minlength=shape[0] * shape[1])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+
+    # Second pass on centered values
+    deviations = values - means[cell]
+    ss = np.bincount(cell, weights=deviations ** 2, minlength=shape[0] * shape[1])
+
+    return counts.reshape(shape), means.reshape(shape), ss.reshape(shape)
+
+
+def weighted_group_statistics(codes):
+    """
+    Per-(proposal, group) weight sums, weighted means, weighted within-cell
+    sums of squares and sums of squared weights, shape (n_proposals, n_groups).
+    """
+    shape = (len(codes['proposals']), len(codes['groups']))
+    cell = cell_index(codes)
+    values, weights = codes['values'], codes['weights']
+
+    weight_sums = np.bincount(cell, weights=weights, minlength=shape[0] * shape[1])
+    weighted_sums = np.bincount(cell, weights=weights * values, minlength=shape[0] * shape[1])
+    weight_squares = np.bincount(cell, weights=weights ** 2, minlength=shape[0] * shape[1])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = weighted_sums / weight_sums
+
+    deviations = values - means[cell]
+    ss = np.bincount(cell, weights=weights * deviations ** 2, minlength=shape[0] * shape[1])
+
+    return (weight_sums.reshape(shape), means.reshape(shape), ss.reshape(shape),
+            weight_squares.reshape(shape))
+
+
+def oneway_from_statistics(counts, means, ss_cells, weight_sums=None):
+    """
+    F, p, eta², degrees of freedom and sums of squares per proposal from cell statistics.
+
+    With weight_sums (and weighted means/sums of squares) this is the WLS
+    one-way ANOVA; degrees of freedom still come from the counts.
+    """
+    present = counts > 0
+    n = counts.sum(axis=1)
+    k = present.sum(axis=1)
+    cell_means = np.where(present, means, 0.0)
+    cell_weights = counts if weight_sums is None else weight_sums
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        grand_mean = (cell_weights * cell_means).sum(axis=1) / cell_weights.sum(axis=1)
+        ss_between = (cell_weights * (cell_means - grand_mean[:, None]) ** 2).sum(axis=1)
+        ss_within = ss_cells.sum(axis=1)
+        ss_total = ss_between + ss_within
+
+        df_between = k - 1
+        df_within = n - k
+        f_stat = (ss_between / df_between) / (ss_within / df_within)
+        p_value = stats.f.sf(f_stat, df_between, df_within)
+        eta_sq = np.where(ss_total > 0, ss_between / ss_total, 0.0)
+
+    return {
+        'f_statistic': f_stat,
+        'p_value': p_value,
+        'eta_squared': eta_sq,
+        'df_between': df_between,
+        'df_within': df_within,
+        'ss_between': ss_between,
+        'ss_within': ss_within,
+        'n': n,
+        'k': k,
+    }
+
+
+def welch_from_statistics(counts, means, ss_cells):
+    """
+    Welch's ANOVA (F, p, df) per proposal from cell statistics.
+
+    Empty groups are ignored; proposals with a non-empty group of size 1 or
+    zero variance get NaN, as in scipy.stats.f_oneway(equal_var=False).
+    """
+    present = counts > 0
+    k = present.sum(axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        variances = ss_cells / (counts - 1)
+        weights = np.where(present, counts / variances, 0.0)
+        invalid = (present & ~((counts > 1) & (variances > 0))).any(axis=1)
+
+        cell_means = np.where(present, means, 0.0)
+        total_weight = weights.sum(axis=1)
+        weighted_mean = (weights * cell_means).sum(axis=1) / total_weight
+
+        a = (weights * (cell_means - weighted_mean[:, None]) ** 2).sum(axis=1) / (k - 1)
+        tmp = np.where(present, (1 - weights / total_weight[:, None]) ** 2 / (counts - 1), 0.0).sum(axis=1)
+        b = 1 + 2 * (k - 2) / (k ** 2 - 1) * tmp
+
+        f_stat = a / b
+        df_within = (k ** 2 - 1) / (3 * tmp)
+        p_value = stats.f.sf(f_stat, k - 1, df_within)
+
+    f_stat[invalid] = np.nan
+    p_value[invalid] = np.nan
+    return {'f_statistic': f_stat, 'p_value': p_value, 'df_between': k - 1, 'df_within': df_within}
+
+
+def kruskal_from_codes(codes):
+    """
+    Kruskal-Wallis H and p per proposal.
+
+    One lexsort by (proposal, value) ranks all proposals at once; tied values
+    within a proposal get their average rank and the tie correction
+    1 - sum(t³ - t) / (n³ - n) is applied as in scipy.stats.kruskal.
+    """
+    n_proposals, n_groups = len(codes['proposals']), len(codes['groups'])
+    proposal_idx, values = codes['proposal_idx'], codes['values']
+
+    order = np.lexsort((values, proposal_idx))
+    sorted_proposals = proposal_idx[order]
+    sorted_values = values[order]
+
+    # Start of every proposal segment and every run of tied values
+    n = np.bincount(proposal_idx, minlength=n_proposals)
+    segment_start = np.concatenate([[0], np.cumsum(n)[:-1]])
+    new_run = np.ones(len(order), dtype=bool)
+    new_run[1:] = (sorted_proposals[1:] != sorted_proposals[:-1]) | (sorted_values[1:] != sorted_values[:-1])
+    run_id = np.cumsum(new_run) - 1
+    run_start = np.flatnonzero(new_run)
+    run_length = np.diff(np.append(run_start, len(order)))
+
+    # Average rank of a run: 1-based position within the proposal, midpoint of the run
+    run_rank = run_start - segment_start[sorted_proposals[run_start]] + (run_length + 1) / 2
+    ranks = np.empty(len(order))
+    ranks[order] = run_rank[run_id]
+
+    cell = cell_index(codes)
+    counts = np.bincount(cell, minlength=n_proposals * n_groups).reshape(n_proposals, n_groups)
+    rank_sums = np.bincount(cell, weights=ranks, minlength=n_proposals * n_groups).reshape(n_proposals, n_groups)
+    k = (counts > 0).sum(axis=1)
+
+    ties = np.bincount(sorted_proposals[run_start], weights=run_length ** 3 - run_length, minlength=n_proposals)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        h = 12 / (n * (n + 1)) * np.where(counts > 0, rank_sums ** 2 / counts, 0.0).sum(axis=1) - 3 * (n + 1)
+        h = h / (1 - ties / (n ** 3 - n))
+        p_value = stats.chi2.sf(h, k - 1)
+
+    return {'h_statistic': h, 'p_value': p_value, 'df_between': k - 1, 'n': n, 'k': k}
+
+
+def cell_stds(counts, ss_cells, weighted=None):
+    """
+    Sample stds per cell and, with weighted = weighted_group_statistics(...),
+    reliability-weighted stds (equal to the unweighted std for equal weights).
+    """
+    weighted_stds = None
+    with np.errstate(invalid='ignore', divide='ignore'):
+        stds = np.where(counts > 1, np.sqrt(ss_cells / (counts - 1)), np.nan)
+        if weighted is not None:
+            weight_sums, _, weighted_ss, weight_squares = weighted
+            effective = weight_sums - weight_squares / weight_sums
+            weighted_stds = np.where((counts > 1) & (effective > 0), np.sqrt(weighted_ss / effective), np.nan)
+    return stds, weighted_stds
+
+
+def group_stats_table(codes, statistics=None):
+    """
+    Long table (proposal_id, group, n, mean, std) of the non-empty cells, plus
+    mean_weighted and std_weighted when codes were encoded with weights.
+    statistics: group_statistics(codes) if already computed.
+    """
+    counts, means, ss_cells = statistics if statistics is not None else group_statistics(codes)
+    weighted = weighted_group_statistics(codes) if codes.get('weights') is not None else None
+    stds, weighted_stds = cell_stds(counts, ss_cells, weighted)
+
+    rows, cols = np.nonzero(counts)
+    table = pd.DataFrame({
+        'proposal_id': codes['proposals'][rows],
+        'group': codes['groups'][cols],
+        'n': counts[rows, cols].astype(int),
+        'mean': means[rows, cols],
+        'std': stds[rows, cols],
+    })
+    if weighted is not None:
+        table['mean_weighted'] = weighted[1][rows, cols]
+        table['std_weighted'] = weighted_stds[rows, cols]
+    return table
+
+
+def group_stats_dicts(groups, counts, means, ss_cells, weighted=None):
+    """
+    Per proposal {'mean': {group: ...}, 'std': {...}, 'count': {...}} for the non-empty groups.
+
+    With weighted = weighted_group_statistics(...) the dicts also hold
+    'mean_weighted' and 'std_weighted' (see cell_stds()).
+    """
+    stds, weighted_stds = cell_stds(counts, ss_cells, weighted)
+    if weighted is not None:
+        weighted_means = weighted[1]
+
+    result = []
+    for i, (row_counts, row_means, row_stds) in enumerate(zip(counts, means, stds)):
+        present = np.flatnonzero(row_counts)
+        stats_dict = {
+            'mean': {groups[j]: row_means[j] for j in present},
+            'std': {groups[j]: row_stds[j] for j in present},
+            'count': {groups[j]: int(row_counts[j]) for j in present},
+        }
+        if weighted is not None:
+            stats_dict['mean_weighted'] = {groups[j]: weighted_means[i, j] for j in present}
+            stats_dict['std_weighted'] = {groups[j]: weighted_stds[i, j] for j in present}
+        result.append(stats_dict)
+    return result
+
+
+def proposal_info(codes, columns=('title_de', 'voting_date')):
+    """First value of the given columns per proposal, aligned with codes['proposals']."""
+    data = codes['data']
+    columns = [col for col in columns if col in data.columns]
+    first = np.unique(codes['proposal_idx'], return_index=True)[1]
+    return data[list(columns)].iloc[first].reset_index(drop=True)
+
+
+def oneway_anova(df, group_col, value_col='ja_prozent', proposal_col='proposal_id', codes=None, method='anova',
+                 weight_col=None, statistics=None):
+    """
+    One-way ANOVA of value_col by group_col for every proposal.
+
+    method: 'anova' (classic F-test), 'welch' (Welch's F for unequal variances)
+    or 'kruskal' (Kruskal-Wallis). For 'kruskal' the f_statistic column holds
+    H and eta_squared the rank-based eta²_H = (H - k + 1) / (n - k); the other
+    methods report the classic eta².
+
+    With weight_col (or codes encoded with weights) the weighted ANOVA is
+    added as f_statistic_weighted, p_value_weighted, eta_squared_weighted and
+    mean_range_weighted, and group_means gains weighted means/stds.
+    statistics: group_statistics(codes) if already computed, so later passes
+    (post-hoc, group tables) can share one computation.
+
+    Returns one row per proposal with at least two non-empty groups, with the
+    columns of anova_results_full.csv (without category/significance flags)
+    and 'group_means' in the format of groupby().agg(['mean', 'std', 'count']).to_dict().
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r}, expected one of {METHODS}")
+    if codes is None:
+        codes = encode(df, group_col, value_col, proposal_col, weight_col)
+    counts, means, ss_cells = statistics if statistics is not None else group_statistics(codes)
+    anova = oneway_from_statistics(counts, means, ss_cells)
+    weighted = weighted_group_statistics(codes) if codes.get('weights') is not None else None
+
+    statistic, p_value, eta_sq = anova['f_statistic'], anova['p_value'], anova['eta_squared']
+    if method == 'welch':
+        welch = welch_from_statistics(counts, means, ss_cells)
+        statistic, p_value = welch['f_statistic'], welch['p_value']
+    elif method == 'kruskal':
+        kruskal = kruskal_from_codes(codes)
+        statistic, p_value = kruskal['h_statistic'], kruskal['p_value']
+        with np.errstate(invalid='ignore', divide='ignore'):
+            eta_sq = (statistic - anova['k'] + 1) / (anova['n'] - anova['k'])
+
+    with np.errstate(invalid='ignore'):
+        present_means = np.where(counts > 0, means, np.nan)
+        mean_range = np.nanmax(present_means, axis=1) - np.nanmin(present_means, axis=1)
+
+    info = proposal_info(codes)
+    results = pd.DataFrame({
+        'proposal_id': codes['proposals'],
+        'title': info['title_de'] if 'title_de' in info else None,
+        'voting_date': info['voting_date'] if 'voting_date' in info else None,
+        'f_statistic': statistic,
+        'p_value': p_value,
+        'eta_squared': eta_sq,
+        'mean_range': mean_range,
+        'n_municipalities': anova['n'],
+        'n_groups': anova['k'],
+        'group_means': group_stats_dicts(codes['groups'], counts, means, ss_cells, weighted),
+    })
+
+    if weighted is not None:
+        weight_sums, weighted_means, weighted_ss, _ = weighted
+        weighted_anova = oneway_from_statistics(counts, weighted_means, weighted_ss, weight_sums)
+        with np.errstate(invalid='ignore'):
+            present_means = np.where(counts > 0, weighted_means, np.nan)
+            results['f_statistic_weighted'] = weighted_anova['f_statistic']
+            results['p_value_weighted'] = weighted_anova['p_value']
+            results['eta_squared_weighted'] = weighted_anova['eta_squared']
+            results['mean_range_weighted'] = np.nanmax(present_means, axis=1) - np.nanmin(present_means, axis=1)
+
+    # Same rule as before: at least two groups with data
+    return results[anova['k'] >= 2].reset_index(drop=True)
+
+
+def split_by_proposal(codes):
+    """(values, group labels 0..k-1) per proposal, aligned with codes['proposals']."""
+    order = np.argsort(codes['proposal_idx'], kind='stable')
+    bounds = np.cumsum(np.bincount(codes['proposal_idx'], minlength=len(codes['proposals'])))[:-1]
+    values = np.split(codes['values'][order], bounds)
+    groups = np.split(codes['group_idx'][order], bounds)
+    return [(x, np.unique(g, return_inverse=True)[1]) for x, g in zip(values, groups)]
+
+
+def permutation_test(values, labels, n_permutations, seed, batch_size=None):
+    """
+    Permutation p-value of the one-way F statistic for one proposal.
+
+    With the total sum of squares fixed, F is monotone in the between-group
+    sum of squares sum_g S_g² / n_g (values centered at the grand mean), so
+    only that is compared. Each batch permutes the values B times and gets all
+    group sums S_g with one (B × n) @ (n × k) product against the one-hot
+    group matrix. p = (1 + #{stat_perm >= stat_obs}) / (1 + n_permutations).
+    """
+    batch_size = batch_size or PERMUTATION_BATCH_SIZE
+    k = labels.max() + 1 if len(labels) else 0
+    if k < 2:
+        return np.nan
+
+    rng = np.random.default_rng(seed)
+    x = values - values.mean()
+    one_hot = np.zeros((len(x), k))
+    one_hot[np.arange(len(x)), labels] = 1.0
+    sizes = one_hot.sum(axis=0)
+
+    observed = ((x @ one_hot) ** 2 / sizes).sum()
+    # Tolerance so permutations that only reorder the same groups count as ties
+    threshold = observed * (1 - 1e-12)
+
+    exceed = 0
+    remaining = n_permutations
+    while remaining > 0:
+        batch = min(batch_size, remaining)
+        permuted = rng.permuted(np.tile(x, (batch, 1)), axis=1)
+        between = ((permuted @ one_hot) ** 2 / sizes).sum(axis=1)
+        exceed += int((between >= threshold).sum())
+        remaining -= batch
+
+    return (1 + exceed) / (1 + n_permutations)
+
+
+def _permutation_task(args):
+    return permutation_test(*args)
+
+
+def permutation_pvalues(codes, n_permutations=10_000, seed=0, n_jobs=None, batch_size=None):
+    """
+    Permutation p-values for all proposals, aligned with codes['proposals'].
+
+    Every proposal gets its own RNG stream from SeedSequence(seed).spawn(), so
+    results are reproducible regardless of how proposals are distributed over
+    the worker processes. n_jobs=1 runs in-process.
+    """
+    proposals = split_by_proposal(codes)
+    seeds = np.random.SeedSequence(seed).spawn(len(proposals))
+    tasks = [(x, labels, n_permutations, s, batch_size) for (x, labels), s in zip(proposals, seeds)]
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    if n_jobs == 1:
+        return np.array([_permutation_task(task) for task in tasks])
+
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        return np.array(list(pool.map(_permutation_task, tasks, chunksize=max(1, len(tasks) // (4 * n_jobs)))))
+
+
+def effect_coding(codes, n_levels):
+    """Sum-to-zero (effect) coded columns of an integer factor with n_levels levels."""
+    columns = np.zeros((len(codes), max(n_levels - 1, 0)))
+    for j in range(n_levels - 1):
+        columns[:, j] = (codes == j).astype(float) - (codes == n_levels - 1)
+    return columns
+
+
+def twoway_designs(a, b):
+    """
+    Design matrices of the models needed for Type II/III sums of squares.
+
+    Effect coding makes the Type III comparisons (full model minus one main
+    effect) meaningful; the hierarchical models span the same space as with
+    any other coding.
+    """
+    a = np.unique(a, return_inverse=True)[1]
+    b = np.unique(b, return_inverse=True)[1]
+    intercept = np.ones((len(a), 1))
+    xa = effect_coding(a, a.max() + 1)
+    xb = effect_coding(b, b.max() + 1)
+    xab = (xa[:, :, None] * xb[:, None, :]).reshape(len(a), -1)
+
+    return {
+        'a': np.hstack([intercept, xa]),
+        'b': np.hstack([intercept, xb]),
+        'a+b': np.hstack([intercept, xa, xb]),
+        'full': np.hstack([intercept, xa, xb, xab]),
+        'full-a': np.hstack([intercept, xb, xab]),
+        'full-b': np.hstack([intercept, xa, xab]),
+    }
+
+
+def residual_ss(x, y):
+    """Rank of x and residual sums of squares of every column of y regressed on x."""
+    u, sv, _ = np.linalg.svd(x, full_matrices=False)
+    rank = int((sv > sv[0] * max(x.shape) * np.finfo(float).eps).sum()) if len(sv) else 0
+    basis = u[:, :rank]
+    residuals = y - basis @ (basis.T @ y)
+    return rank, (residuals ** 2).sum(axis=0)
+
+
+def twoway_anova(df, factor_a, factor_b, value_col='ja_prozent', proposal_col='proposal_id',
+                 unit_col='municipality_id'):
+    """
+    Two-way ANOVA with interaction for every proposal.
+
+    Values are arranged in a (units × proposals) matrix; proposals are grouped
+    by their pattern of observed units and each pattern is solved as one
+    multi-column least-squares problem per model. Empty cells (e.g. no urban
+    Romansh municipality) reduce the interaction degrees of freedom through the
+    matrix rank.
+
+    Returns a long table with one row per (proposal, term) and the columns
+    df, ss_type2, f_type2, p_type2, ss_type3, f_type3, p_type3 and
+    partial_eta_squared (Type II).
+    """
+    data = df.dropna(subset=[factor_a, factor_b, value_col])
+    unit_idx, units = pd.factorize(data[unit_col])
+    proposal_idx, proposals = pd.factorize(data[proposal_col], sort=False)
+
+    # Factor levels are municipality attributes: one value per unit
+    first = np.unique(unit_idx, return_index=True)[1]
+    a_levels = data[factor_a].to_numpy()[first]
+    b_levels = data[factor_b].to_numpy()[first]
+
+    y = np.full((len(units), len(proposals)), np.nan)
+    y[unit_idx, proposal_idx] = data[value_col].to_numpy(dtype=float)
+    observed = ~np.isnan(y)
+
+    patterns, pattern_idx = np.unique(observed.T, axis=0, return_inverse=True)
+    terms = [factor_a, factor_b, f'{factor_a}:{factor_b}', 'residual']
+    columns = {name: np.full((len(proposals), len(terms)), np.nan) for name in
+               ['df', 'ss_type2', 'ss_type3']}
+
+    for pattern, rows in enumerate(patterns):
+        cols = np.flatnonzero(pattern_idx.ravel() == pattern)
+        designs = twoway_designs(a_levels[rows], b_levels[rows])
+        fits = {name: residual_ss(x, y[np.ix_(rows, cols)]) for name, x in designs.items()}
+
+        rank_full, rss_full = fits['full']
+        rank_main, rss_main = fits['a+b']
+        columns['df'][cols] = [
+            rank_main - fits['b'][0],
+            rank_main - fits['a'][0],
+            rank_full - rank_main,
+            rows.sum() - rank_full,
+        ]
+        ss_interaction = rss_main - rss_full
+        columns['ss_type2'][cols] = np.column_stack([
+            fits['b'][1] - rss_main, fits['a'][1] - rss_main, ss_interaction, rss_full,
+        ])
+        columns['ss_type3'][cols] = np.column_stack([
+            fits['full-a'][1] - rss_full, fits['full-b'][1] - rss_full, ss_interaction, rss_full,
+        ])
+
+    df_terms, df_resid = columns['df'][:, :3], columns['df'][:, 3:]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ms_resid = columns['ss_type2'][:, 3:] / df_resid
+        f2 = columns['ss_type2'][:, :3] / df_terms / ms_resid
+        f3 = columns['ss_type3'][:, :3] / df_terms / ms_resid
+        p2 = stats.f.sf(f2, df_terms, df_resid)
+        p3 = stats.f.sf(f3, df_terms, df_resid)
+        partial_eta = columns['ss_type2'][:, :3] / (columns['ss_type2'][:, :3] + columns['ss_type2'][:, 3:])
+
+    nan_column = np.full((len(proposals), 1), np.nan)
+    info = proposal_info({'data': data, 'proposal_idx': proposal_idx})
+    results = pd.DataFrame({
+        'proposal_id': np.repeat(np.asarray(proposals), len(terms)),
+        'title': np.repeat(info['title_de'].to_numpy(), len(terms)) if 'title_de' in info else None,
+        'voting_date': np.repeat(info['voting_date'].to_numpy(), len(terms)) if 'voting_date' in info else None,
+        'term': np.tile(terms, len(proposals)),
+        'df': columns['df'].ravel(),
+        'ss_type2': columns['ss_type2'].ravel(),
+        'f_type2': np.hstack([f2, nan_column]).ravel(),
+        'p_type2': np.hstack([p2, nan_column]).ravel(),
+        'ss_type3': columns['ss_type3'].ravel(),
+        'f_type3': np.hstack([f3, nan_column]).ravel(),
+        'p_type3': np.hstack([p3, nan_column]).ravel(),
+        'partial_eta_squared': np.hstack([partial_eta, nan_column]).ravel(),
+    })
+    results['df'] = results['df'].astype(int)
+    return results
@@ -0,0 +1,177 @@
+"""
+Categorical Feature Scan
+========================
+One-way ANOVA of ja_prozent for every categorical Raumgliederung feature in
+municipality_features and municipality_features_2024 × every proposal
+(several thousand tests), with Benjamini-Hochberg FDR correction across all
+of them.
+
+The votes are loaded once; per feature only the group codes change, so each
+feature is one vectorized oneway_anova() call over all proposals.
+
+Writes:
+- anova_feature_scan.csv: one row per (feature, proposal) with p_fdr
+- anova_feature_ranking.csv: typologies ranked by how well they explain
+  the voting splits (mean omega², which does not grow with the number of
+  groups like eta² does)
+
+    python anova_feature_scan.py
+"""
+
+import sqlite3
+import time
+import pandas as pd
+import numpy as np
+from scipy import stats
+import warnings
+warnings.filterwarnings('ignore')
+
+from anova_data import DB_PATH, OUTPUT_DIR
+from anova_engine import oneway_anova
+
+FEATURE_TABLES = ('municipality_features', 'municipality_features_2024')
+
+# Identifier columns of the feature tables (everything else is a typology)
+ID_COLUMNS = ('bfs_nr', 'gemeindename', 'kanton_nr', 'kanton', 'bezirk_nr', 'bezirksname')
+
+# Features with more groups are treated as identifiers, not typologies
+MAX_GROUPS = 150
+
+FDR_ALPHA = 0.05
+
+
+def load_votes(conn):
+    """Load ja_prozent per municipality and proposal"""
+    query = """
+    SELECT
+        v.municipality_id,
+        v.proposal_id,
+        v.title_de,
+        v.voting_date,
+        v.ja_prozent
+    FROM v_voting_results_analysis v
+    WHERE v.ja_prozent IS NOT NULL
+    """
+    return pd.read_sql_query(query, conn)
+
+
+def load_features(conn):
+    """
+    Categorical features of all feature tables as {(table, feature): codes by bfs_nr}.
+
+    Features with a single or more than MAX_GROUPS distinct codes are skipped,
+    as are exact duplicates of an earlier feature (e.g. unchanged 2024 columns).
+    """
+    present = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+    features, seen = {}, []
+    for table in FEATURE_TABLES:
+        if table not in present:
+            print(f"  {table} not found, skipped")
+            continue
+
+        df = pd.read_sql_query(f"SELECT * FROM {table}", conn)
+        df = df.drop_duplicates('bfs_nr').set_index('bfs_nr')
+        for feature in df.columns.difference(ID_COLUMNS, sort=False):
+            codes = pd.to_numeric(df[feature], errors='coerce')
+            if not 2 <= codes.nunique() <= MAX_GROUPS:
+                continue
+            if any(codes.equals(other) for other in seen):
+                continue
+            seen.append(codes)
+            features[(table, feature)] = codes
+
+    return features
+
+
+def scan_features(votes, features):
+    """One-way ANOVA of every feature × proposal, FDR-corrected across all tests"""
+    municipality_ids = votes['municipality_id']
+
+    results = []
+    for (table, feature), codes in features.items():
+        data = votes.assign(group=municipality_ids.map(codes))
+        feature_results = oneway_anova(data, 'group', 'ja_prozent')
+        feature_results.insert(0, 'feature_table', table)
+        feature_results.insert(1, 'feature', feature)
+        results.append(feature_results.drop(columns=['group_means']))
+
+    scan = pd.concat(results, ignore_index=True)
+
+    # Omega², a less biased effect size for differing numbers of groups
+    # (not clipped at 0, so its mean over proposals stays unbiased)
+    df_between = scan['n_groups'] - 1
+    omega = df_between * (scan['f_statistic'] - 1)
+    scan['omega_squared'] = omega / (omega + scan['n_municipalities'])
+
+    tested = scan['p_value'].notna()
+    scan['p_fdr'] = np.nan
+    scan.loc[tested, 'p_fdr'] = stats.false_discovery_control(scan.loc[tested, 'p_value'], method='bh')
+    scan['significant_fdr'] = scan['p_fdr'] < FDR_ALPHA
+
+    return scan
+
+
+def rank_features(scan):
+    """Per feature: share of proposals with FDR-significant splits and mean effect sizes, ranked"""
+    grouped = scan.groupby(['feature_table', 'feature'], sort=False)
+    ranking = grouped.agg(
+        n_groups=('n_groups', 'max'),
+        n_proposals=('proposal_id', 'size'),
+        n_significant_fdr=('significant_fdr', 'sum'),
+        mean_omega_squared=('omega_squared', 'mean'),
+        mean_eta_squared=('eta_squared', 'mean'),
+        median_eta_squared=('eta_squared', 'median'),
+        max_eta_squared=('eta_squared', 'max'),
+    )
+    ranking['share_significant_fdr'] = ranking['n_significant_fdr'] / ranking['n_proposals']
+
+    # Proposal with the strongest split per feature
+    best = scan.loc[grouped['eta_squared'].idxmax(), ['feature_table', 'feature', 'proposal_id', 'title']]
+    ranking = ranking.join(best.set_index(['feature_table', 'feature']).rename(
+        columns={'proposal_id': 'top_proposal_id', 'title': 'top_proposal_title'}))
+
+    ranking = ranking.sort_values('mean_omega_squared', ascending=False).reset_index()
+    ranking.insert(0, 'rank', np.arange(1, len(ranking) + 1))
+    return ranking
+
+
+def main():
+    print("=" * 80)
+    print("CATEGORICAL FEATURE SCAN - ANOVA over all Raumgliederungen")
+    print("=" * 80)
+
+    start = time.perf_counter()
+    conn = sqlite3.connect(DB_PATH)
+    votes = load_votes(conn)
+    features = load_features(conn)
+    conn.close()
+    print(f"Loaded {len(votes):,} voting records, {len(features)} categorical features")
+
+    scan = scan_features(votes, features)
+    ranking = rank_features(scan)
+    elapsed = time.perf_counter() - start
+
+    n_tests = scan['p_value'].notna().sum()
+    print(f"\n{n_tests:,} tests in {elapsed:.1f}s, "
+          f"{scan['significant_fdr'].sum():,} significant at FDR {FDR_ALPHA}")
+
+    print("\nTypologien nach mittlerer Effektstärke (omega²):")
+    for _, row in ranking.iterrows():
+        print(f"{row['rank']:3}. {row['feature'][:45]:45} ({row['feature_table']}, {row['n_groups']} Gruppen) "
+              f"omega² = {row['mean_omega_squared']:.4f} | "
+              f"signifikant {100 * row['share_significant_fdr']:.0f}%")
+
+    scan_path = OUTPUT_DIR / 'anova_feature_scan.csv'
+    scan.to_csv(scan_path, index=False)
+    print(f"\nScan results saved to: {scan_path}")
+
+    ranking_path = OUTPUT_DIR / 'anova_feature_ranking.csv'
+    ranking.to_csv(ranking_path, index=False)
+    print(f"Ranking saved to: {ranking_path}")
+
+    return scan, ranking
+
+
+if __name__ == "__main__":
+    main()
@@ -2,73 +2,58 @@
 ANOVA Visualizations for Swiss Federal Voting Data
 ===================================================
 Creates publication-ready plots for the ANOVA analysis results.
+
+The top proposals per category are the highest ranked ones of
+anova_results_full.csv (significant, by eta²), and their group means/stds
+come from anova_group_stats.csv, both written by anova_analysis.py.
+
+The figures are rendered through scripts/figure_build.py: independent
+figures in a process pool, and figures whose data, parameters and plotting
+code are unchanged are skipped (--force renders all).
 """
 
-import sqlite3
 import pandas as pd
 import numpy as np
 import matplotlib
 matplotlib.use('Agg')  # Headless backend
 import matplotlib.pyplot as plt
 import seaborn as sns
-from scipy import stats
+from pathlib import Path
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
-# Set style
-plt.style.use('seaborn-v0_8-whitegrid')
-plt.rcParams['figure.figsize'] = (12, 8)
-plt.rcParams['font.size'] = 11
-plt.rcParams['axes.titlesize'] = 14
-plt.rcParams['axes.labelsize'] = 12
-
-DB_PATH = '/home/jonas/ffhs-stats-project-local/data/processed/swiss_votings.db'
-OUTPUT_DIR = '/home/jonas/ffhs-stats-project-local/5_ANOVA'
-
-
-def load_data():
-    """Load voting data with municipality features"""
-    conn = sqlite3.connect(DB_PATH)
-
-    query = """
-    SELECT
-        v.municipality_id,
-        v.municipality_name,
-        v.voting_date,
-        v.proposal_id,
-        v.title_de,
-        v.ja_prozent,
-        mf.sprachgebiete,
-        mf.staedtische_laendliche_gebiete,
-        mf.grossregionen_der_schweiz
-    FROM v_voting_results_analysis v
-    INNER JOIN municipality_features mf ON v.municipality_id = mf.bfs_nr
-    WHERE v.ja_prozent IS NOT NULL
-    """
-    df = pd.read_sql_query(query, conn)
-
-    # Load labels
-    labels_query = """
-    SELECT feature_name, code, label
-    FROM feature_labels
-    WHERE feature_name IN ('sprachgebiete', 'staedtische_laendliche_gebiete', 'grossregionen_der_schweiz')
-    """
-    labels_df = pd.read_sql_query(labels_query, conn)
-    conn.close()
-
-    # Create label mappings
-    label_maps = {}
-    for feature in ['sprachgebiete', 'staedtische_laendliche_gebiete', 'grossregionen_der_schweiz']:
-        feature_labels = labels_df[labels_df['feature_name'] == feature]
-        label_maps[feature] = dict(zip(feature_labels['code'], feature_labels['label']))
-
-    return df, label_maps
-
-
-def plot_effect_size_distribution():
-    """Plot distribution of effect sizes (eta²) across all proposals"""
-    results_df = pd.read_csv(f'{OUTPUT_DIR}/anova_results_full.csv')
+from anova_data import OUTPUT_DIR, load_analysis_data
+
+# Shared figure builder in scripts/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+from figure_build import build_figures, figure_task
+
+# Style
+ANOVA_RC = {
+    **plt.style.library['seaborn-v0_8-whitegrid'],
+    'figure.figsize': (12, 8),
+    'font.size': 11,
+    'axes.titlesize': 14,
+    'axes.labelsize': 12,
+}
+SAVEFIG = {'dpi': 150, 'bbox_inches': 'tight'}
+
+# Number of top proposals plotted per category
+TOP_N = {
+    'Röstigraben (Sprachgebiete)': 6,
+    'Stadt-Land': 6,
+    'Grossregionen': 3,
+}
+
 
+def top_proposals(results_df, category, n):
+    """Proposal ids of the n highest ranked (significant, by eta²) proposals of a category"""
+    ranked = results_df[(results_df['category'] == category) & results_df['rank'].notna()]
+    return ranked.sort_values('rank')['proposal_id'].head(n).tolist()
+
+def plot_effect_size_distribution(results_df):
+    """Plot distribution of effect sizes (eta²) across all proposals"""
     fig, axes = plt.subplots(1, 3, figsize=(15, 5))
 
     categories = [
@@ -88,36 +73,24 @@ def plot_effect_size_distribution():
         ax.legend()
 
     plt.tight_layout()
-    plt.savefig(f'{OUTPUT_DIR}/effect_size_distribution.png', dpi=150, bbox_inches='tight')
-    plt.close()
-    print(f"Saved: effect_size_distribution.png")
-
+    return fig
 
-def plot_top_proposals_comparison(df, label_maps):
-    """Plot comparison of top proposals for each category"""
-    results_df = pd.read_csv(f'{OUTPUT_DIR}/anova_results_full.csv')
 
-    # Top 5 for each category
-    top_proposals = {
-        'Röstigraben': [166, 200, 103, 165, 157],  # From analysis output
-        'Stadt-Land': [202, 185, 188, 172, 186],
-        'Grossregionen': [222, 80, 106, 4, 200]
-    }
-
-    # Plot Röstigraben Top 5
+def plot_top_roestigraben(group_stats, proposal_ids):
+    """Plot group means of the top Röstigraben proposals"""
     fig, axes = plt.subplots(2, 3, figsize=(16, 10))
 
     # Sprachgebiete labels
     sprach_labels = {1: 'DE', 2: 'FR', 3: 'IT', 4: 'RM'}
     sprach_colors = {'DE': '#FF6B6B', 'FR': '#4ECDC4', 'IT': '#45B7D1', 'RM': '#96CEB4'}
 
-    for idx, proposal_id in enumerate(top_proposals['Röstigraben'][:6]):
+    for idx, proposal_id in enumerate(proposal_ids[:6]):
         ax = axes[idx // 3, idx % 3]
-        proposal_data = df[df['proposal_id'] == proposal_id]
-        title = proposal_data['title_de'].iloc[0][:50] + "..."
+        proposal_stats = group_stats[group_stats['proposal_id'] == proposal_id]
+        title = proposal_stats['title'].iloc[0][:50] + "..."
 
-        means = proposal_data.groupby('sprachgebiete')['ja_prozent'].mean()
-        stds = proposal_data.groupby('sprachgebiete')['ja_prozent'].std()
+        means = proposal_stats.set_index('group')['mean'].sort_index()
+        stds = proposal_stats.set_index('group')['std'].sort_index()
 
         x_labels = [sprach_labels[k] for k in means.index]
         colors = [sprach_colors[l] for l in x_labels]
@@ -134,23 +107,23 @@ def plot_top_proposals_comparison(df, label_maps):
 
     plt.suptitle('Top 6 Abstimmungen mit grösstem Röstigraben (Sprachgebiete)', fontsize=14, y=1.02)
     plt.tight_layout()
-    plt.savefig(f'{OUTPUT_DIR}/top_roestigraben.png', dpi=150, bbox_inches='tight')
-    plt.close()
-    print(f"Saved: top_roestigraben.png")
+    return fig
+
 
-    # Plot Stadt-Land Top 6
+def plot_top_stadt_land(group_stats, proposal_ids):
+    """Plot group means of the top Stadt-Land proposals"""
     fig, axes = plt.subplots(2, 3, figsize=(16, 10))
 
     stadt_labels = {1: 'Städtisch', 2: 'Intermediär', 3: 'Ländlich'}
     stadt_colors = {'Städtisch': '#E74C3C', 'Intermediär': '#F39C12', 'Ländlich': '#27AE60'}
 
-    for idx, proposal_id in enumerate(top_proposals['Stadt-Land'][:6]):
+    for idx, proposal_id in enumerate(proposal_ids[:6]):
         ax = axes[idx // 3, idx % 3]
-        proposal_data = df[df['proposal_id'] == proposal_id]
-        title = proposal_data['title_de'].iloc[0][:50] + "..."
+        proposal_stats = group_stats[group_stats['proposal_id'] == proposal_id]
+        title = proposal_stats['title'].iloc[0][:50] + "..."
 
-        means = proposal_data.groupby('staedtische_laendliche_gebiete')['ja_prozent'].mean()
-        stds = proposal_data.groupby('staedtische_laendliche_gebiete')['ja_prozent'].std()
+        means = proposal_stats.set_index('group')['mean'].sort_index()
+        stds = proposal_stats.set_index('group')['std'].sort_index()
 
         x_labels = [stadt_labels[k] for k in means.index]
         colors = [stadt_colors[l] for l in x_labels]
@@ -166,11 +139,11 @@ def plot_top_proposals_comparison(df, label_maps):
 
     plt.suptitle('Top 6 Abstimmungen mit grösstem Stadt-Land Unterschied', fontsize=14, y=1.02)
     plt.tight_layout()
-    plt.savefig(f'{OUTPUT_DIR}/top_stadt_land.png', dpi=150, bbox_inches='tight')
-    plt.close()
-    print(f"Saved: top_stadt_land.png")
+    return fig
 
-    # Plot Grossregionen Top 3 (more complex)
+
+def plot_top_grossregionen(group_stats, proposal_ids):
+    """Plot group means of the top Grossregionen proposals (top 3, more complex)"""
     fig, axes = plt.subplots(1, 3, figsize=(18, 6))
 
     region_labels = {
@@ -179,15 +152,15 @@ def plot_top_proposals_comparison(df, label_maps):
     }
     region_colors = plt.cm.Set2(np.linspace(0, 1, 7))
 
-    for idx, proposal_id in enumerate(top_proposals['Grossregionen'][:3]):
+    for idx, proposal_id in enumerate(proposal_ids[:3]):
         ax = axes[idx]
-        proposal_data = df[df['proposal_id'] == proposal_id]
-        title = proposal_data['title_de'].iloc[0][:45] + "..."
+        proposal_stats = group_stats[group_stats['proposal_id'] == proposal_id]
+        title = proposal_stats['title'].iloc[0][:45] + "..."
 
-        means = proposal_data.groupby('grossregionen_der_schweiz')['ja_prozent'].mean().sort_values(ascending=False)
+        means = proposal_stats.set_index('group')['mean'].sort_values(ascending=False)
 
         x_labels = [region_labels[k] for k in means.index]
-        colors = [region_colors[k-1] for k in means.index]
+        colors = [region_colors[int(k) - 1] for k in means.index]
 
         bars = ax.barh(x_labels, means.values, color=colors, alpha=0.8)
         ax.set_xlabel('Ja-Anteil (%)')
@@ -200,15 +173,11 @@ def plot_top_proposals_comparison(df, label_maps):
 
     plt.suptitle('Top 3 Abstimmungen mit grösstem regionalen Unterschied', fontsize=14, y=1.02)
     plt.tight_layout()
-    plt.savefig(f'{OUTPUT_DIR}/top_grossregionen.png', dpi=150, bbox_inches='tight')
-    plt.close()
-    print(f"Saved: top_grossregionen.png")
+    return fig
 
 
-def plot_summary_heatmap():
+def plot_summary_heatmap(results_df):
     """Create summary visualization"""
-    results_df = pd.read_csv(f'{OUTPUT_DIR}/anova_results_full.csv')
-
     # Create summary statistics
     summary = results_df.groupby('category').agg({
         'eta_squared': ['mean', 'median', 'max', 'std'],
@@ -269,57 +238,114 @@ def plot_summary_heatmap():
                f'{bar.get_height():.1f}%', ha='center', va='bottom', fontsize=9)
 
     plt.tight_layout()
-    plt.savefig(f'{OUTPUT_DIR}/anova_summary_comparison.png', dpi=150, bbox_inches='tight')
-    plt.close()
-    print(f"Saved: anova_summary_comparison.png")
+    return fig
+
+
+def example_title(example):
+    """'Title (year)' and eta² of an example proposal"""
+    title = example['title'] if len(example['title']) <= 40 else example['title'][:37] + "..."
+    return f"{title} ({str(example['voting_date'])[:4]})\neta² = {example['eta_squared']:.2f}"
 
 
-def plot_detailed_example(df, label_maps):
-    """Create detailed boxplot for one example proposal per category"""
+def plot_detailed_example(df, label_maps, examples, region_order):
+    """Create detailed boxplot for the top proposal per category"""
     fig, axes = plt.subplots(1, 3, figsize=(16, 5))
 
-    # Röstigraben example: Ernährungssouveränität (highest effect)
+    # Röstigraben example (highest effect)
     ax = axes[0]
-    proposal_data = df[df['proposal_id'] == 166].copy()
-    proposal_data['Sprachgebiet'] = proposal_data['sprachgebiete'].map(label_maps['sprachgebiete'])
-    order = ['Französisch', 'Italienisch', 'Deutsch', 'Rätoromanisch']
-    sns.boxplot(data=proposal_data, x='Sprachgebiet', y='ja_prozent', order=order, ax=ax, palette='Set2')
-    ax.set_title('Ernährungssouveränität (2018)\neta² = 0.78', fontsize=11)
-    ax.set_ylabel('Ja-Anteil (%)')
-    ax.set_xlabel('')
-    ax.tick_params(axis='x', rotation=45)
-
-    # Stadt-Land example: Massentierhaltung
+    example = examples['Röstigraben (Sprachgebiete)']
+    if example is None:
+        ax.axis('off')
+    else:
+        proposal_data = df[df['proposal_id'] == example['proposal_id']].copy()
+        proposal_data['Sprachgebiet'] = proposal_data['sprachgebiete'].map(label_maps['sprachgebiete'])
+        order = ['Französisch', 'Italienisch', 'Deutsch', 'Rätoromanisch']
+        sns.boxplot(data=proposal_data, x='Sprachgebiet', y='ja_prozent', order=order, ax=ax, palette='Set2')
+        ax.set_title(example_title(example), fontsize=11)
+        ax.set_ylabel('Ja-Anteil (%)')
+        ax.set_xlabel('')
+        ax.tick_params(axis='x', rotation=45)
+
+    # Stadt-Land example
     ax = axes[1]
-    proposal_data = df[df['proposal_id'] == 202].copy()
-    proposal_data['Region'] = proposal_data['staedtische_laendliche_gebiete'].map({
-        1: 'Städtisch', 2: 'Intermediär', 3: 'Ländlich'
-    })
-    order = ['Städtisch', 'Intermediär', 'Ländlich']
-    sns.boxplot(data=proposal_data, x='Region', y='ja_prozent', order=order, ax=ax, palette='Set1')
-    ax.set_title('Massentierhaltungsinitiative (2022)\neta² = 0.24', fontsize=11)
-    ax.set_ylabel('Ja-Anteil (%)')
-    ax.set_xlabel('')
-
-    # Grossregionen example: Liegenschaftssteuern
+    example = examples['Stadt-Land']
+    if example is None:
+        ax.axis('off')
+    else:
+        proposal_data = df[df['proposal_id'] == example['proposal_id']].copy()
+        proposal_data['Region'] = proposal_data['staedtische_laendliche_gebiete'].map({
+            1: 'Städtisch', 2: 'Intermediär', 3: 'Ländlich'
+        })
+        order = ['Städtisch', 'Intermediär', 'Ländlich']
+        sns.boxplot(data=proposal_data, x='Region', y='ja_prozent', order=order, ax=ax, palette='Set1')
+        ax.set_title(example_title(example), fontsize=11)
+        ax.set_ylabel('Ja-Anteil (%)')
+        ax.set_xlabel('')
+
+    # Grossregionen example, regions ordered by mean
     ax = axes[2]
-    proposal_data = df[df['proposal_id'] == 222].copy()
-    proposal_data['Region'] = proposal_data['grossregionen_der_schweiz'].map({
-        1: 'Léman', 2: 'Mittelland', 3: 'NW-CH',
-        4: 'Zürich', 5: 'Ost-CH', 6: 'Zentral-CH', 7: 'Tessin'
-    })
-    means = proposal_data.groupby('Region')['ja_prozent'].mean().sort_values(ascending=False)
-    order = means.index.tolist()
-    sns.boxplot(data=proposal_data, x='Region', y='ja_prozent', order=order, ax=ax, palette='Set3')
-    ax.set_title('Liegenschaftssteuern Zweitliegenschaften (2025)\neta² = 0.68', fontsize=11)
-    ax.set_ylabel('Ja-Anteil (%)')
-    ax.set_xlabel('')
-    ax.tick_params(axis='x', rotation=45)
+    example = examples['Grossregionen']
+    if example is None:
+        ax.axis('off')
+    else:
+        region_labels = {
+            1: 'Léman', 2: 'Mittelland', 3: 'NW-CH',
+            4: 'Zürich', 5: 'Ost-CH', 6: 'Zentral-CH', 7: 'Tessin'
+        }
+        proposal_data = df[df['proposal_id'] == example['proposal_id']].copy()
+        proposal_data['Region'] = proposal_data['grossregionen_der_schweiz'].map(region_labels)
+        order = [region_labels[k] for k in region_order]
+        sns.boxplot(data=proposal_data, x='Region', y='ja_prozent', order=order, ax=ax, palette='Set3')
+        ax.set_title(example_title(example), fontsize=11)
+        ax.set_ylabel('Ja-Anteil (%)')
+        ax.set_xlabel('')
+        ax.tick_params(axis='x', rotation=45)
 
     plt.tight_layout()
-    plt.savefig(f'{OUTPUT_DIR}/anova_boxplot_examples.png', dpi=150, bbox_inches='tight')
-    plt.close()
-    print(f"Saved: anova_boxplot_examples.png")
+    return fig
+
+
+def figure_tasks(results_df, group_stats, df, label_maps):
+    """One build task per figure, each with only the rows it plots"""
+    titles = results_df.drop_duplicates('proposal_id').set_index('proposal_id')['title']
+
+    def top_stats(category):
+        proposal_ids = top_proposals(results_df, category, TOP_N[category])
+        rows = group_stats[(group_stats['category'] == category) & group_stats['proposal_id'].isin(proposal_ids)]
+        rows = rows[['proposal_id', 'group', 'mean', 'std']].assign(title=rows['proposal_id'].map(titles))
+        return rows.reset_index(drop=True), {'proposal_ids': proposal_ids}
+
+    # Top proposal per category for the boxplots
+    examples = {}
+    for category in TOP_N:
+        top = top_proposals(results_df, category, 1)
+        row = results_df[(results_df['category'] == category) & results_df['proposal_id'].isin(top)]
+        examples[category] = (row[['proposal_id', 'title', 'voting_date', 'eta_squared']].iloc[0].to_dict()
+                              if len(row) else None)
+    example_ids = [example['proposal_id'] for example in examples.values() if example is not None]
+    example_rows = df.loc[df['proposal_id'].isin(example_ids),
+                          ['proposal_id', 'sprachgebiete', 'staedtische_laendliche_gebiete',
+                           'grossregionen_der_schweiz', 'ja_prozent']].reset_index(drop=True)
+    region_order = []
+    if examples['Grossregionen'] is not None:
+        region_stats = group_stats[(group_stats['category'] == 'Grossregionen')
+                                   & (group_stats['proposal_id'] == examples['Grossregionen']['proposal_id'])]
+        region_order = region_stats.sort_values('mean', ascending=False)['group'].tolist()
+
+    results_columns = ['category', 'eta_squared', 'significant', 'highly_significant']
+    figures = [
+        ('effect_size_distribution.png', plot_effect_size_distribution, results_df[results_columns], {}),
+        ('anova_summary_comparison.png', plot_summary_heatmap, results_df[results_columns], {}),
+        ('top_roestigraben.png', plot_top_roestigraben, *top_stats('Röstigraben (Sprachgebiete)')),
+        ('top_stadt_land.png', plot_top_stadt_land, *top_stats('Stadt-Land')),
+        ('top_grossregionen.png', plot_top_grossregionen, *top_stats('Grossregionen')),
+        ('anova_boxplot_examples.png', plot_detailed_example, example_rows,
+         {'label_maps': label_maps, 'examples': examples, 'region_order': region_order}),
+    ]
+    return [
+        figure_task(Path(OUTPUT_DIR) / name, render, data=data, params=params, savefig=SAVEFIG, rc=ANOVA_RC)
+        for name, render, data, params in figures
+    ]
 
 
 def main():
@@ -327,12 +353,15 @@ def main():
     print("Creating ANOVA Visualizations")
     print("=" * 60)
 
-    df, label_maps = load_data()
+    # Results and data are read once and handed to the figures that need them
+    results_df = pd.read_csv(Path(OUTPUT_DIR) / 'anova_results_full.csv')
+    group_stats = pd.read_csv(Path(OUTPUT_DIR) / 'anova_group_stats.csv')
+    df, label_maps = load_analysis_data()
 
-    plot_effect_size_distribution()
-    plot_summary_heatmap()
-    plot_top_proposals_comparison(df, label_maps)
-    plot_detailed_example(df, label_maps)
+    result = build_figures(figure_tasks(results_df, group_stats, df, label_maps), force='--force' in sys.argv)
+    for path in result['rendered']:
+        print(f"Saved: {Path(path).name}")
+    print(f"Unchanged: {len(result['skipped'])} figures")
 
     print("\nAll visualizations saved to:", OUTPUT_DIR)
 
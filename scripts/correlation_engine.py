@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Vectorized feature × proposal correlations.
+
+The vote shares are pivoted once into a municipality × proposal matrix and
+aligned with the municipality × feature matrix on the BFS number. With the
+NaN masks Mx, My and the zero-filled (column-centered) values X, Y, all
+pairwise-complete sums follow from a handful of matrix products:
+
+    n   = Mx' My        Sx  = X' My      Sy  = Mx' Y
+    Sxx = (X²)' My      Syy = Mx' Y²     Sxy = X' Y
+
+so Pearson r, n and p for every (proposal, feature) pair cost about one
+matrix multiply instead of 223 merges and 223 × 22 pearsonr calls. Spearman
+ranks depend on which municipalities a pair shares, so they are ranked per
+feature over all proposals at once (one loop over the features).
+
+Returns the long table of 1_EDA/3_features_voting_correlations.ipynb:
+    from correlation_engine import correlation_table
+    df_corr = correlation_table(df_votes, df_features, feature_cols)
+
+The same masked products of the vote matrix with itself give the
+pairwise-complete proposal × proposal correlation and covariance, without
+dropping municipalities that appear in only some votes (mergers) or
+imputing them. proposal_similarity() caches the result in
+data/cache/correlations/ keyed by the content version of the source tables
+(db_version.py), as input for
+factor analysis and clustering:
+    python scripts/correlation_engine.py [--refresh]
+"""
+
+import sqlite3
+import pandas as pd
+import numpy as np
+from scipy import stats
+from pathlib import Path
+import hashlib
+import json
+import sys
+import logging
+
+from db_version import data_version
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DB_PATH = Path(__file__).parent.parent / 'data' / 'processed' / 'swiss_votings.db'
+CACHE_DIR = Path(__file__).parent.parent / 'data' / 'cache' / 'correlations'
+
+# Bump when the similarity computation or the cache layout changes
+SIMILARITY_VERSION = 1
+
+# Tables behind v_voting_results_analysis
+SOURCE_TABLES = ('votings', 'proposals', 'voting_results', 'municipal_changes')
+
+# Thresholds of the notebooks: proposals need at least MIN_UNITS merged
+# municipalities, pairs more than MIN_PAIRS complete observations
+MIN_UNITS = 100
+MIN_PAIRS = 50
+
+
+def vote_matrix(df_votes, value_col='ja_prozent', unit_col='bfs_nr', proposal_col='proposal_id'):
+    """Municipality × proposal matrix of value_col (proposals in order of first appearance)."""
+    proposals = df_votes[proposal_col].drop_duplicates()
+    wide = df_votes.groupby([unit_col, proposal_col])[value_col].mean().unstack(proposal_col)
+    return wide[proposals.to_numpy()]
+
+
+def align(votes, df_features, feature_cols, unit_col='bfs_nr'):
+    """Feature matrix on the municipalities of the vote matrix (missing municipalities as NaN)."""
+    features = df_features.drop_duplicates(unit_col).set_index(unit_col)[list(feature_cols)]
+    return features.reindex(votes.index).astype(float)
+
+
+def masked_sums(x, y):
+    """
+    Pairwise-complete n, sums, sums of squares and cross-products of the
+    columns of x (m × p) and y (m × f), each of shape (p, f).
+    """
+    mx, my = ~np.isnan(x), ~np.isnan(y)
+    x0 = np.where(mx, x - np.nanmean(x, axis=0), 0.0)
+    y0 = np.where(my, y - np.nanmean(y, axis=0), 0.0)
+    mx, my = mx.astype(float), my.astype(float)
+
+    return {
+        'n': mx.T @ my,
+        'sx': x0.T @ my,
+        'sy': mx.T @ y0,
+        'sxx': (x0 ** 2).T @ my,
+        'syy': mx.T @ y0 ** 2,
+        'sxy': x0.T @ y0,
+    }
+
+
+def pearson_from_sums(sums):
+    """Pearson r, covariance and n from masked_sums()."""
+    n = sums['n']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cross = sums['sxy'] - sums['sx'] * sums['sy'] / n
+        var_x = sums['sxx'] - sums['sx'] ** 2 / n
+        var_y = sums['syy'] - sums['sy'] ** 2 / n
+        r = np.clip(cross / np.sqrt(var_x * var_y), -1, 1)
+        cov = cross / (n - 1)
+    return r, cov, n
+
+
+def correlation_pvalues(r, n):
+    """Two-sided p-values of r under H0: rho = 0 (t-test with n - 2 df, as pearsonr/spearmanr)."""
+    df = n - 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = r * np.sqrt(df / ((1 - r) * (1 + r)))
+        p = 2 * stats.t.sf(np.abs(t), df)
+    return np.where(df > 0, p, np.nan)
+
+
+def pearson_matrix(x, y):
+    """Pearson r, p and n for every column pair of x (m × p) and y (m × f)."""
+    r, _, n = pearson_from_sums(masked_sums(x, y))
+    return r, correlation_pvalues(r, n), n
+
+
+def spearman_matrix(x, y):
+    """
+    Spearman rho, p and n for every column pair, ranked on each pair's
+    complete observations (average ranks for ties).
+    """
+    mx = ~np.isnan(x)
+    rho = np.full((x.shape[1], y.shape[1]), np.nan)
+    n = np.zeros((x.shape[1], y.shape[1]))
+
+    for j in range(y.shape[1]):
+        # Both sides restricted to the rows observed in column j and each proposal
+        both = mx & ~np.isnan(y[:, [j]])
+        x_ranks = stats.rankdata(np.where(both, x, np.nan), axis=0, nan_policy='omit')
+        y_ranks = stats.rankdata(np.where(both, y[:, [j]], np.nan), axis=0, nan_policy='omit')
+
+        count = both.sum(axis=0)
+        xc = np.where(both, x_ranks - np.nanmean(x_ranks, axis=0), 0.0)
+        yc = np.where(both, y_ranks - np.nanmean(y_ranks, axis=0), 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rho[:, j] = (xc * yc).sum(axis=0) / np.sqrt((xc ** 2).sum(axis=0) * (yc ** 2).sum(axis=0))
+        n[:, j] = count
+
+    rho = np.clip(rho, -1, 1)
+    return rho, correlation_pvalues(rho, n), n
+
+
+def correlation_table(df_votes, df_features, feature_cols, method='pearson', value_col='ja_prozent',
+                      unit_col='bfs_nr', min_units=MIN_UNITS, min_pairs=MIN_PAIRS, significance=0.001):
+    """
+    Long table (proposal_id, title_de, voting_date, feature, correlation, p_value, n,
+    abs_correlation, significant) of every proposal × feature correlation.
+
+    method: 'pearson' or 'spearman'. Like the notebooks, proposals with fewer
+    than min_units municipalities present in df_features and pairs with at
+    most min_pairs complete observations are left out.
+    """
+    votes = vote_matrix(df_votes, value_col, unit_col)
+    features = align(votes, df_features, feature_cols, unit_col)
+    x, y = votes.to_numpy(dtype=float), features.to_numpy(dtype=float)
+
+    if method == 'pearson':
+        r, p, n = pearson_matrix(x, y)
+    elif method == 'spearman':
+        r, p, n = spearman_matrix(x, y)
+    else:
+        raise ValueError(f"Unknown method {method!r}, expected 'pearson' or 'spearman'")
+
+    # Municipalities per proposal that exist in the feature table (the merge size)
+    has_features = votes.index.isin(df_features[unit_col])
+    units = (~np.isnan(x) & has_features[:, None]).sum(axis=0)
+
+    keep = (units[:, None] >= min_units) & (n > min_pairs)
+    rows, cols = np.nonzero(keep)
+    table = pd.DataFrame({
+        'proposal_id': votes.columns.to_numpy()[rows],
+        'feature': np.asarray(feature_cols)[cols],
+        'correlation': r[rows, cols],
+        'p_value': p[rows, cols],
+        'n': n[rows, cols].astype(int),
+    })
+
+    info_cols = [col for col in ('title_de', 'voting_date') if col in df_votes.columns]
+    if info_cols:
+        info = df_votes.drop_duplicates('proposal_id').set_index('proposal_id')[info_cols]
+        table = table.join(info, on='proposal_id')
+    table = table[['proposal_id', *info_cols, 'feature', 'correlation', 'p_value', 'n']]
+
+    table['abs_correlation'] = table['correlation'].abs()
+    table['significant'] = table['p_value'] < significance
+    return table
+
+
+def load_vote_matrix(conn, value_col='ja_prozent'):
+    """Municipality × proposal matrix of value_col from v_voting_results_analysis (no expat votes)."""
+    df = pd.read_sql_query(f"""
+        SELECT municipality_id, proposal_id, {value_col}
+        FROM v_voting_results_analysis
+        WHERE municipality_id < 9000
+        ORDER BY voting_date, proposal_id
+    """, conn)
+    return vote_matrix(df, value_col, unit_col='municipality_id')
+
+
+def pairwise_similarity(votes, min_pairs=MIN_PAIRS):
+    """
+    Pairwise-complete correlation, covariance and n of the columns of the
+    vote matrix, as proposal × proposal DataFrames.
+
+    Pairs with at most min_pairs shared municipalities are NaN. The matrices
+    need not be positive semi-definite; see clip_to_psd().
+    """
+    x = votes.to_numpy(dtype=float)
+    r, cov, n = pearson_from_sums(masked_sums(x, x))
+    sparse = n <= min_pairs
+    r[sparse] = np.nan
+    cov[sparse] = np.nan
+
+    index = votes.columns
+    return {
+        'correlation': pd.DataFrame(r, index=index, columns=index),
+        'covariance': pd.DataFrame(cov, index=index, columns=index),
+        'n': pd.DataFrame(n.astype(int), index=index, columns=index),
+    }
+
+
+def clip_to_psd(matrix, min_eigenvalue=0.0):
+    """
+    Nearest symmetric matrix with eigenvalues >= min_eigenvalue (eigenvalue
+    clipping); a correlation matrix keeps its unit diagonal.
+
+    NaN pairs of pairwise_similarity() (too few shared municipalities) are
+    taken as 0 (uncorrelated) before clipping. Proposals with a NaN diagonal
+    are left out and stay NaN in the result.
+    """
+    values = matrix.to_numpy(dtype=float)
+    defined = ~np.isnan(np.diag(values))
+    is_correlation = np.allclose(np.diag(values)[defined], 1)
+
+    sub = np.nan_to_num(values[np.ix_(defined, defined)], nan=0.0)
+    eigenvalues, vectors = np.linalg.eigh((sub + sub.T) / 2)
+    clipped_sub = (vectors * np.maximum(eigenvalues, min_eigenvalue)) @ vectors.T
+    if is_correlation:
+        scale = np.sqrt(np.diag(clipped_sub))
+        clipped_sub = clipped_sub / np.outer(scale, scale)
+
+    clipped = np.full(values.shape, np.nan)
+    clipped[np.ix_(defined, defined)] = clipped_sub
+    return pd.DataFrame(clipped, index=matrix.index, columns=matrix.columns)
+
+
+def proposal_similarity(db_path=DB_PATH, value_col='ja_prozent', min_pairs=MIN_PAIRS,
+                        cache_dir=CACHE_DIR, refresh=False):
+    """
+    pairwise_similarity() of the vote matrix, served from the cache while the
+    database is unchanged. refresh=True recomputes.
+    """
+    cache_dir = Path(cache_dir)
+    conn = sqlite3.connect(db_path)
+    try:
+        payload = json.dumps({'version': SIMILARITY_VERSION, 'data': data_version(conn, SOURCE_TABLES),
+                              'value_col': value_col, 'min_pairs': min_pairs}, sort_keys=True)
+        key = hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+        path = cache_dir / f'proposal_similarity_{key}.npz'
+
+        if path.exists() and not refresh:
+            logger.info(f"Proposal similarity from cache: {path.name}")
+            with np.load(path) as cached:
+                index = pd.Index(cached['proposal_ids'], name='proposal_id')
+                return {
+                    name: pd.DataFrame(cached[name], index=index, columns=index)
+                    for name in ('correlation', 'covariance', 'n')
+                }
+
+        votes = load_vote_matrix(conn, value_col)
+    finally:
+        conn.close()
+
+    similarity = pairwise_similarity(votes, min_pairs)
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp.npz')
+    np.savez(tmp_path, proposal_ids=votes.columns.to_numpy(),
+             **{name: frame.to_numpy() for name, frame in similarity.items()})
+    tmp_path.replace(path)
+    for stale in cache_dir.glob('proposal_similarity_*.npz'):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+    logger.info(f"Proposal similarity of {votes.shape[1]} proposals over {votes.shape[0]} municipalities cached")
+
+    return similarity
+
+
+def main():
+    similarity = proposal_similarity(refresh='--refresh' in sys.argv)
+    n = similarity['n'].to_numpy()
+    r = similarity['correlation'].to_numpy()
+    off_diagonal = ~np.eye(len(n), dtype=bool)
+    logger.info(f"{len(n)} proposals, shared municipalities per pair: "
+                f"min {n[off_diagonal].min()}, median {np.median(n[off_diagonal]):.0f}")
+    logger.info(f"Pairs without correlation: {np.isnan(r[off_diagonal]).sum()}, "
+                f"mean correlation {np.nanmean(r[off_diagonal]):.3f}")
+    return similarity
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Coverage of voting municipalities by the feature tables.
+
+The municipalities that appear in voting_results are read once and keyed by
+integer BFS number. Every feature table is then compared to that set with
+array set operations instead of correlated SQL subqueries.
+
+Creates tables:
+- coverage_summary: per feature table (and its data vintage) the number of
+  covered, missing and extra municipalities
+- coverage_by_proposal: the same per proposal
+- coverage_gaps: the missing and extra BFS numbers per feature table
+
+Run after any import:
+    python scripts/coverage_report.py
+"""
+
+import sqlite3
+import pandas as pd
+import numpy as np
+from pathlib import Path
+from datetime import datetime
+import logging
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DB_PATH = Path(__file__).parent.parent / 'data' / 'processed' / 'swiss_votings.db'
+
+# Feature tables and the vintage of their data
+FEATURE_TABLES = {
+    'municipality_features': 'Raumgliederungen (be-d-00.04-rgs-01)',
+    'municipality_features_2024': 'Raumgliederungen 2024',
+    'municipality_continuous_features': 'Regionalportraets 2021 (2019)',
+    'estv_income_2020': 'ESTV 2020',
+    'municipality_features_complete': 'complete (incl. fusions)',
+}
+
+# Aggregation units and expats that share the municipality id range
+EXCLUDED_NAME_PREFIXES = ('bezirk', 'district', 'distretto', 'wahlkreis', 'region', 'kanton', 'canton')
+
+
+def voting_municipalities(conn):
+    """
+    Return the distinct (proposal_id, bfs_nr, geo_name) municipality rows of voting_results.
+
+    Same selection as before: 100 < bfs_nr < 9000 and no district/canton names
+    (case-insensitive like SQL LIKE), evaluated in pandas on one DISTINCT query.
+    """
+    df = pd.read_sql_query("SELECT DISTINCT proposal_id, geo_id, geo_name FROM voting_results", conn)
+
+    bfs = pd.to_numeric(df['geo_id'], errors='coerce')
+    names = df['geo_name'].fillna('').str.lower()
+    keep = (bfs > 100) & (bfs < 9000) & ~names.str.startswith(EXCLUDED_NAME_PREFIXES)
+
+    df = df[keep].assign(bfs_nr=bfs[keep].astype(int))
+    return df[['proposal_id', 'bfs_nr', 'geo_name']].reset_index(drop=True)
+
+
+def table_municipalities(conn, table):
+    """Return the sorted unique integer BFS numbers of a feature table."""
+    df = pd.read_sql_query(f"SELECT DISTINCT bfs_nr FROM {table}", conn)
+    return np.unique(pd.to_numeric(df['bfs_nr'], errors='coerce').dropna().astype(int))
+
+
+def existing_tables(conn, tables):
+    """Filter `tables` to those present in the database."""
+    present = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    return [table for table in tables if table in present]
+
+
+def compute_coverage(conn, tables=None, votes=None):
+    """
+    Compute coverage of the voting municipalities for each feature table.
+
+    Returns a dict with the DataFrames 'summary', 'by_proposal' and 'gaps'.
+    """
+    if votes is None:
+        votes = voting_municipalities(conn)
+    tables = existing_tables(conn, tables or list(FEATURE_TABLES))
+
+    voting_set = np.unique(votes['bfs_nr'])
+    proposal_ids = votes['proposal_id']
+
+    summary_rows, by_proposal, gaps = [], [], []
+    for table in tables:
+        table_set = table_municipalities(conn, table)
+        missing = np.setdiff1d(voting_set, table_set, assume_unique=True)
+        extra = np.setdiff1d(table_set, voting_set, assume_unique=True)
+        covered = len(voting_set) - len(missing)
+
+        summary_rows.append({
+            'feature_table': table,
+            'vintage': FEATURE_TABLES.get(table, ''),
+            'n_voting_municipalities': len(voting_set),
+            'n_table_municipalities': len(table_set),
+            'covered': covered,
+            'missing': len(missing),
+            'extra': len(extra),
+            'coverage_pct': round(100 * covered / len(voting_set), 2) if len(voting_set) else np.nan,
+        })
+
+        in_table = pd.Series(np.isin(votes['bfs_nr'].to_numpy(), table_set), index=votes.index)
+        per_proposal = in_table.groupby(proposal_ids).agg(['size', 'sum'])
+        by_proposal.append(pd.DataFrame({
+            'feature_table': table,
+            'proposal_id': per_proposal.index,
+            'n_municipalities': per_proposal['size'].to_numpy(),
+            'covered': per_proposal['sum'].to_numpy(),
+            'missing': (per_proposal['size'] - per_proposal['sum']).to_numpy(),
+        }))
+
+        gaps.append(pd.DataFrame({'feature_table': table, 'bfs_nr': missing, 'status': 'missing'}))
+        gaps.append(pd.DataFrame({'feature_table': table, 'bfs_nr': extra, 'status': 'extra'}))
+
+    summary = pd.DataFrame(summary_rows)
+    summary['created_at'] = datetime.now().isoformat(timespec='seconds')
+    by_proposal = pd.concat(by_proposal, ignore_index=True) if by_proposal else pd.DataFrame()
+    if len(by_proposal) > 0:
+        by_proposal['coverage_pct'] = (100 * by_proposal['covered'] / by_proposal['n_municipalities']).round(2)
+    gaps = pd.concat(gaps, ignore_index=True) if gaps else pd.DataFrame()
+
+    return {'summary': summary, 'by_proposal': by_proposal, 'gaps': gaps}
+
+
+def write_coverage(conn, report):
+    """Store the coverage report in the database for reuse."""
+    report['summary'].to_sql('coverage_summary', conn, index=False, if_exists='replace')
+    report['by_proposal'].to_sql('coverage_by_proposal', conn, index=False, if_exists='replace')
+    report['gaps'].to_sql('coverage_gaps', conn, index=False, if_exists='replace')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_coverage_proposal ON coverage_by_proposal(proposal_id)")
+    conn.commit()
+    logger.info(f"Stored coverage for {len(report['summary'])} feature tables")
+
+
+def print_summary(report):
+    """Print coverage per feature table."""
+    print("\n" + "="*60)
+    print("FEATURE COVERAGE OF VOTING MUNICIPALITIES")
+    print("="*60)
+    for _, row in report['summary'].iterrows():
+        print(f"{row['feature_table']} [{row['vintage']}]")
+        print(f"  covered {row['covered']} / {row['n_voting_municipalities']} ({row['coverage_pct']:.1f}%), "
+              f"missing {row['missing']}, extra {row['extra']}")
+        if len(report['by_proposal']) > 0:
+            per_proposal = report['by_proposal']
+            worst = per_proposal[per_proposal['feature_table'] == row['feature_table']]['coverage_pct'].min()
+            print(f"  lowest coverage of a single proposal: {worst:.1f}%")
+    print("="*60)
+
+
+def main():
+    conn = sqlite3.connect(DB_PATH)
+    report = compute_coverage(conn)
+    write_coverage(conn, report)
+    conn.close()
+    print_summary(report)
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,7 @@ Create a complete features view that includes:
 1. Original continuous features
 2. ESTV income data
 3. Aggregated data for fusion municipalities from predecessors
+   (rules per column in feature_aggregation.py)
 
 This ensures 100% coverage for all municipalities in voting data.
 """
@@ -14,30 +15,62 @@ import numpy as np
 from pathlib import Path
 import logging
 
+from feature_aggregation import aggregate_features
+from feature_store import build_feature_store
+from coverage_report import voting_municipalities, compute_coverage, write_coverage
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 DB_PATH = Path(__file__).parent.parent / 'data' / 'processed' / 'swiss_votings.db'
 
 
+ESTV_COLS = ['steuerbares_einkommen_total', 'steuerpflichtige_total', 'steuerbares_einkommen_pro_kopf',
+             'pct_einkommen_ueber_100k', 'pct_einkommen_unter_40k']
+
+
+def merger_edges(mergers, targets):
+    """Return unique (new_bfs_number, old_bfs_number) pairs for the given fusion municipalities."""
+    edges = mergers.loc[mergers['new_bfs_number'].isin(targets), ['new_bfs_number', 'old_bfs_number']]
+    return edges.drop_duplicates()
+
+
+def aggregate_fusion_features(features, mergers, targets, names):
+    """
+    Aggregate predecessor features for all fusion municipalities at once.
+
+    Joins the merger edges to the feature frame and applies the rules from
+    feature_aggregation.AGGREGATION_RULES in one grouped pass over all targets.
+    """
+    edges = merger_edges(mergers, targets)
+    pred = features.merge(edges, left_on='bfs_nr', right_on='old_bfs_number', how='inner')
+
+    no_pred = sorted(set(targets) - set(pred['new_bfs_number']))
+    if no_pred:
+        logger.warning(f"No predecessors found for {len(no_pred)} municipalities: {no_pred}")
+
+    value_cols = [col for col in features.columns if col not in ['bfs_nr', 'gemeindename']]
+    agg_df = aggregate_features(pred[value_cols], pred['new_bfs_number'])
+
+    no_pop = agg_df.index[~(agg_df['einwohner'] > 0)]
+    if len(no_pop) > 0:
+        logger.warning(f"Zero population for predecessors of {len(no_pop)} municipalities: {list(no_pop)}")
+    agg_df = agg_df[agg_df['einwohner'] > 0]
+
+    agg_df.index.name = 'bfs_nr'
+    agg_df = agg_df.reset_index()
+    agg_df.insert(1, 'gemeindename', agg_df['bfs_nr'].map(names))
+
+    return agg_df[['bfs_nr', 'gemeindename'] + value_cols]
+
+
 def create_complete_view():
     """Create a complete features table with all municipalities."""
     conn = sqlite3.connect(DB_PATH)
 
     # 1. Get all unique municipalities from voting data (excluding aggregations and expats)
-    voting_munis = pd.read_sql_query("""
-        SELECT DISTINCT CAST(geo_id AS INTEGER) as bfs_nr, geo_name
-        FROM voting_results
-        WHERE CAST(geo_id AS INTEGER) > 100
-        AND CAST(geo_id AS INTEGER) < 9000
-        AND geo_name NOT LIKE 'Bezirk%'
-        AND geo_name NOT LIKE 'District%'
-        AND geo_name NOT LIKE 'Distretto%'
-        AND geo_name NOT LIKE 'Wahlkreis%'
-        AND geo_name NOT LIKE 'Region%'
-        AND geo_name NOT LIKE 'Kanton%'
-        AND geo_name NOT LIKE 'Canton%'
-    """, conn)
+    votes = voting_municipalities(conn)
+    voting_munis = votes[['bfs_nr', 'geo_name']].drop_duplicates()
     logger.info(f"Found {len(voting_munis)} municipalities in voting data")
 
     # 2. Get continuous features
@@ -48,8 +81,8 @@ def create_complete_view():
 
     # 3. Get ESTV income data
     estv_income = pd.read_sql_query("""
-        SELECT bfs_nr, steuerbares_einkommen_pro_kopf,
-               pct_einkommen_ueber_100k, pct_einkommen_unter_40k
+        SELECT bfs_nr, steuerbares_einkommen_total, steuerpflichtige_total,
+               steuerbares_einkommen_pro_kopf, pct_einkommen_ueber_100k, pct_einkommen_unter_40k
         FROM estv_income_2020
     """, conn)
     logger.info(f"Loaded {len(estv_income)} municipalities with ESTV income data")
@@ -69,97 +102,24 @@ def create_complete_view():
     """, conn)
     logger.info(f"Found {len(mergers)} merger records with available predecessor data")
 
-    # 5. Create aggregated data for fusion municipalities
-    aggregated_rows = []
-    for new_bfs in missing_bfs:
-        # Find predecessors from the mergers dataframe
-        pred_rows = mergers[mergers['new_bfs_number'] == new_bfs]
-        predecessors = pred_rows['old_bfs_number'].tolist()
-
-        if not predecessors:
-            # Try direct query
-            pred_direct = pd.read_sql_query(f"""
-                SELECT CAST(mc.old_bfs_number AS INTEGER) as old_bfs_number
-                FROM municipal_changes mc
-                INNER JOIN municipality_continuous_features mcf ON mc.old_bfs_number = mcf.bfs_nr
-                WHERE mc.is_merger = 1 AND mc.new_bfs_number = {new_bfs}
-            """, conn)
-            predecessors = pred_direct['old_bfs_number'].tolist()
-
-        if not predecessors:
-            logger.warning(f"No predecessors found for BFS {new_bfs}")
-            continue
-
-        logger.info(f"BFS {new_bfs}: found {len(predecessors)} predecessors: {predecessors}")
-
-        # Get predecessor data from continuous features
-        pred_data = cont_features[cont_features['bfs_nr'].isin(predecessors)]
-
-        if len(pred_data) == 0:
-            logger.warning(f"No feature data found for predecessors of BFS {new_bfs}")
-            continue
-
-        # Aggregate: population-weighted average for percentages, sum for counts
-        total_pop = pred_data['einwohner'].sum()
-
-        if total_pop == 0:
-            logger.warning(f"Zero population for predecessors of BFS {new_bfs}")
-            continue
-
-        # Create aggregated row
-        agg_row = {
-            'bfs_nr': new_bfs,
-            'gemeindename': voting_munis[voting_munis['bfs_nr'] == new_bfs]['geo_name'].iloc[0],
-            'einwohner': total_pop,
-        }
-
-        # Population-weighted averages for percentage columns
-        pct_cols = [col for col in pred_data.columns if 'anteil' in col or 'pct' in col
-                    or 'dichte' in col or 'quote' in col or 'ziffer' in col or 'groesse' in col]
-        for col in pct_cols:
-            if col in pred_data.columns and pred_data[col].notna().any():
-                weights = pred_data['einwohner'] / total_pop
-                agg_row[col] = (pred_data[col] * weights).sum()
-
-        # Sum for count columns
-        count_cols = ['privathaushalte', 'einwohner']
-        for col in count_cols:
-            if col in pred_data.columns:
-                agg_row[col] = pred_data[col].sum()
-
-        # Copy other columns (take first non-null value)
-        for col in pred_data.columns:
-            if col not in agg_row and col not in ['bfs_nr', 'gemeindename']:
-                valid_vals = pred_data[col].dropna()
-                if len(valid_vals) > 0:
-                    agg_row[col] = valid_vals.iloc[0]
-
-        aggregated_rows.append(agg_row)
-
-    logger.info(f"Created {len(aggregated_rows)} aggregated rows for fusion municipalities")
-
-    # 6. Combine original and aggregated data
-    if aggregated_rows:
-        agg_df = pd.DataFrame(aggregated_rows)
-        combined_features = pd.concat([cont_features, agg_df], ignore_index=True)
-    else:
-        combined_features = cont_features
+    # 5. Merge with ESTV income data
+    features = cont_features.merge(estv_income, on='bfs_nr', how='left')
 
-    # 7. Merge with ESTV income data
-    combined_features = combined_features.merge(estv_income, on='bfs_nr', how='left')
+    # 6. Create aggregated data for fusion municipalities (one grouped pass over all targets)
+    names = voting_munis.drop_duplicates('bfs_nr').set_index('bfs_nr')['geo_name']
+    agg_df = aggregate_fusion_features(features, mergers, missing_bfs, names)
+    logger.info(f"Created {len(agg_df)} aggregated rows for fusion municipalities")
 
-    # 8. Also aggregate ESTV data for fusion municipalities
-    for new_bfs in missing_bfs:
-        predecessors = mergers[mergers['new_bfs_number'] == new_bfs]['old_bfs_number'].tolist()
-        pred_estv = estv_income[estv_income['bfs_nr'].isin(predecessors)]
+    # 7. ESTV 2020 already reports some fusion municipalities directly; prefer those values
+    agg_df = agg_df.set_index('bfs_nr')
+    agg_df.update(estv_income.set_index('bfs_nr')[ESTV_COLS])
+    agg_df = agg_df.reset_index()
 
-        if len(pred_estv) > 0:
-            # Simple average for income data
-            idx = combined_features[combined_features['bfs_nr'] == new_bfs].index
-            if len(idx) > 0:
-                combined_features.loc[idx, 'steuerbares_einkommen_pro_kopf'] = pred_estv['steuerbares_einkommen_pro_kopf'].mean()
-                combined_features.loc[idx, 'pct_einkommen_ueber_100k'] = pred_estv['pct_einkommen_ueber_100k'].mean()
-                combined_features.loc[idx, 'pct_einkommen_unter_40k'] = pred_estv['pct_einkommen_unter_40k'].mean()
+    # 8. Combine original and aggregated data
+    if len(agg_df) > 0:
+        combined_features = pd.concat([features, agg_df], ignore_index=True)
+    else:
+        combined_features = features
 
     # 9. Save to database
     conn.execute("DROP TABLE IF EXISTS municipality_features_complete")
@@ -169,29 +129,17 @@ def create_complete_view():
 
     logger.info(f"Created municipality_features_complete with {len(combined_features)} rows")
 
-    # 10. Verify coverage
-    coverage = pd.read_sql_query("""
-        SELECT
-            COUNT(DISTINCT CAST(vr.geo_id AS INTEGER)) as covered,
-            (SELECT COUNT(DISTINCT CAST(geo_id AS INTEGER))
-             FROM voting_results
-             WHERE CAST(geo_id AS INTEGER) > 100 AND CAST(geo_id AS INTEGER) < 9000
-             AND geo_name NOT LIKE 'Bezirk%' AND geo_name NOT LIKE 'District%'
-             AND geo_name NOT LIKE 'Distretto%' AND geo_name NOT LIKE 'Wahlkreis%'
-             AND geo_name NOT LIKE 'Region%' AND geo_name NOT LIKE 'Kanton%'
-             AND geo_name NOT LIKE 'Canton%') as total
-        FROM voting_results vr
-        WHERE EXISTS (SELECT 1 FROM municipality_features_complete mfc
-                      WHERE mfc.bfs_nr = CAST(vr.geo_id AS INTEGER))
-        AND CAST(vr.geo_id AS INTEGER) > 100 AND CAST(vr.geo_id AS INTEGER) < 9000
-    """, conn)
+    # 10. Verify coverage (set-based, also stored in the coverage_* tables)
+    report = compute_coverage(conn, votes=votes)
+    write_coverage(conn, report)
+    coverage = report['summary'].set_index('feature_table').loc['municipality_features_complete']
 
     print("\n" + "="*60)
     print("COMPLETE FEATURES VIEW - SUMMARY")
     print("="*60)
     print(f"Total municipalities in features: {len(combined_features)}")
-    print(f"Coverage of voting municipalities: {coverage['covered'].iloc[0]} / {coverage['total'].iloc[0]}")
-    print(f"Coverage percentage: {100 * coverage['covered'].iloc[0] / coverage['total'].iloc[0]:.1f}%")
+    print(f"Coverage of voting municipalities: {coverage['covered']} / {coverage['n_voting_municipalities']}")
+    print(f"Coverage percentage: {coverage['coverage_pct']:.1f}%")
     print("\nKey columns:")
     for col in ['einwohner', 'bevoelkerungsdichte', 'auslaenderanteil',
                 'anteil_65_plus_jahre', 'steuerbares_einkommen_pro_kopf']:
@@ -206,3 +154,4 @@ def create_complete_view():
 
 if __name__ == '__main__':
     create_complete_view()
+    build_feature_store(DB_PATH)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Content version of SQLite tables, the cache key of on-disk snapshots.
+
+data_version() returns the schema version plus a SHA-256 checksum over the
+rows of every present table, so corrected rows (in-place UPDATEs) invalidate
+a cache just like inserts and deletes.
+
+Checksumming reads every row (~2 s per 500k rows), so the checksums are
+memoized per database file in data/cache/db_version.json and only
+recomputed after the file (or its WAL) was written, i.e. when its size or
+modification time changed.
+
+    from db_version import data_version
+    version = data_version(conn, ('votings', 'proposals', 'voting_results'))
+"""
+
+from pathlib import Path
+import hashlib
+import json
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+MEMO_PATH = PROJECT_DIR / 'data' / 'cache' / 'db_version.json'
+
+# Rows hashed per fetch
+FETCH_SIZE = 50_000
+
+
+def table_checksum(conn, table):
+    """SHA-256 over all rows of table in rowid order."""
+    digest = hashlib.sha256()
+    cursor = conn.execute(f"SELECT * FROM {table} ORDER BY rowid")
+    while True:
+        batch = cursor.fetchmany(FETCH_SIZE)
+        if not batch:
+            break
+        digest.update(repr(batch).encode('utf-8'))
+    cursor.close()
+    return digest.hexdigest()[:32]
+
+
+def database_file(conn):
+    """Path of the main database file of conn, or None for in-memory databases."""
+    for _, name, path in conn.execute("PRAGMA database_list"):
+        if name == 'main':
+            return Path(path).resolve() if path else None
+    return None
+
+
+def file_state(path):
+    """[size, mtime_ns] of the database file and of its WAL, if any."""
+    state = []
+    for file in (path, path.with_name(path.name + '-wal')):
+        if file.exists():
+            stat = file.stat()
+            state.append([stat.st_size, stat.st_mtime_ns])
+    return state
+
+
+def load_memo(memo_path=MEMO_PATH):
+    """Return {database path: {'state': ..., 'tables': {table: checksum}}}."""
+    memo_path = Path(memo_path)
+    if not memo_path.exists():
+        return {}
+    try:
+        with open(memo_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_memo(memo, memo_path=MEMO_PATH):
+    """Write the memo via a temp file."""
+    memo_path = Path(memo_path)
+    memo_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = memo_path.with_suffix('.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(memo, f, indent=1, sort_keys=True)
+    tmp_path.replace(memo_path)
+
+
+def data_version(conn, tables, memo_path=None):
+    """Schema version plus a content checksum of every present table (memo in MEMO_PATH by default)."""
+    memo_path = memo_path or MEMO_PATH
+    present = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    version = {'schema_version': conn.execute("PRAGMA schema_version").fetchone()[0]}
+
+    path = database_file(conn)
+    if path is None:
+        for table in tables:
+            if table in present:
+                version[table] = table_checksum(conn, table)
+        return version
+
+    # Stat before hashing: a write during hashing leaves a stale state, which
+    # only forces another recomputation next time
+    state = file_state(path)
+    memo = load_memo(memo_path)
+    entry = memo.get(str(path))
+    checksums = entry['tables'] if entry and entry['state'] == state else {}
+
+    missing = [table for table in tables if table in present and table not in checksums]
+    for table in missing:
+        checksums[table] = table_checksum(conn, table)
+    if missing or not entry or entry['state'] != state:
+        memo[str(path)] = {'state': state, 'tables': checksums}
+        save_memo(memo, memo_path)
+
+    for table in tables:
+        if table in present:
+            version[table] = checksums[table]
+    return version
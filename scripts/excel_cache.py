@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache for parsed Excel sheets.
+
+Parsing the BFS/ESTV workbooks with openpyxl is the slowest step of the
+import scripts. read_excel_cached() keys every (workbook, sheet, read options)
+combination on the SHA-256 of the workbook's bytes and stores the parsed frame
+as Parquet in data/cache/excel/. Later runs load the Parquet file until the
+workbook content changes.
+
+Frames that do not survive a Parquet round trip unchanged (mixed-type
+columns, non-string headers) are cached as pickle instead.
+"""
+
+import pandas as pd
+from pathlib import Path
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(__file__).parent.parent / 'data' / 'cache' / 'excel'
+
+# Digest per (path, mtime, size), so a workbook is hashed once per process
+_digests = {}
+
+
+def file_digest(path):
+    """Return the SHA-256 hex digest of a file's content."""
+    path = Path(path)
+    stat = path.stat()
+    memo_key = (str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+    if memo_key not in _digests:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        _digests[memo_key] = digest.hexdigest()
+    return _digests[memo_key]
+
+
+def cache_key(path, sheet_name, options):
+    """Key for one parsed sheet: workbook content + sheet name + read options."""
+    payload = json.dumps(
+        {'file': file_digest(path), 'sheet': sheet_name, 'options': options},
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+def load_cached(key, cache_dir=None):
+    """Return the cached frame for `key`, or None."""
+    cache_dir = cache_dir or CACHE_DIR
+    parquet_path = Path(cache_dir) / f'{key}.parquet'
+    if parquet_path.exists():
+        return pd.read_parquet(parquet_path)
+    pickle_path = Path(cache_dir) / f'{key}.pkl'
+    if pickle_path.exists():
+        return pd.read_pickle(pickle_path)
+    return None
+
+
+def store_cached(key, df, cache_dir=None):
+    """Store `df` as Parquet if it round-trips unchanged, otherwise as pickle."""
+    cache_dir = Path(cache_dir or CACHE_DIR)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    parquet_path = cache_dir / f'{key}.parquet'
+
+    try:
+        df.to_parquet(parquet_path)
+        roundtrip = pd.read_parquet(parquet_path)
+        if list(roundtrip.columns) == list(df.columns) and roundtrip.equals(df):
+            return parquet_path
+    except Exception as e:
+        logger.debug(f"Parquet cache not possible for {key}: {e}")
+    parquet_path.unlink(missing_ok=True)
+
+    pickle_path = cache_dir / f'{key}.pkl'
+    df.to_pickle(pickle_path)
+    return pickle_path
+
+
+def read_excel_cached(path, sheet_name=0, cache_dir=None, **kwargs):
+    """
+    Drop-in for pd.read_excel(path, sheet_name=..., **kwargs) on a single sheet.
+
+    Serves the parsed frame from the cache while the workbook is unchanged.
+    """
+    key = cache_key(path, sheet_name, kwargs)
+    df = load_cached(key, cache_dir)
+    if df is not None:
+        logger.debug(f"Cache hit: {Path(path).name} [{sheet_name}]")
+        return df
+
+    logger.debug(f"Cache miss: {Path(path).name} [{sheet_name}], parsing workbook")
+    df = pd.read_excel(path, sheet_name=sheet_name, **kwargs)
+    store_cached(key, df, cache_dir)
+    return df
+
+
+def read_excel_sheets_cached(path, sheet_names, cache_dir=None, **kwargs):
+    """
+    Read several sheets of one workbook with the same options.
+
+    Duplicate sheet names are read once, cached sheets are served from the
+    cache and all remaining sheets are parsed in a single workbook pass.
+    Returns {sheet_name: frame}; sheets missing from the workbook are left out
+    with a warning.
+    """
+    sheet_names = list(dict.fromkeys(sheet_names))
+    keys = {sheet: cache_key(path, sheet, kwargs) for sheet in sheet_names}
+
+    frames = {}
+    for sheet in sheet_names:
+        df = load_cached(keys[sheet], cache_dir)
+        if df is not None:
+            frames[sheet] = df
+
+    missing = [sheet for sheet in sheet_names if sheet not in frames]
+    if missing:
+        logger.debug(f"Parsing {len(missing)} sheets of {Path(path).name} in one pass")
+        xlsx = pd.ExcelFile(path)
+        available = [sheet for sheet in missing if sheet in xlsx.sheet_names]
+        for sheet in missing:
+            if sheet not in available:
+                logger.warning(f"Sheet {sheet} not found in {Path(path).name}")
+
+        parsed = pd.read_excel(xlsx, sheet_name=available, **kwargs) if available else {}
+        xlsx.close()
+        for sheet, df in parsed.items():
+            store_cached(keys[sheet], df, cache_dir)
+            frames[sheet] = df
+
+    return frames
@@ -7,15 +7,62 @@ Creates a CSV file with:
 - For each proposal: 3 columns (ja_absolut, nein_absolut, ja_prozent)
 - Column headers use proposal_id (e.g., 194_ja, 194_nein, 194_pct)
 
+Also writes typed Parquet files (integer counts, float percentages,
+geo_type as dictionary, zstd) when pyarrow is installed:
+- data/voting_results_export.parquet: same wide layout as the CSV (one row group)
+- data/voting_results_export_long.parquet: (geo_type, geo_id, proposal_id, ja, nein, pct),
+  one row group per level
+
 Output: data/voting_results_export.csv
+
+With --stream the CSV is written row by row straight from a database cursor
+(constant memory, no Parquet files):
+    python scripts/export_data.py --stream
+
+With --incremental only new or changed proposals are read from the database
+and spliced into the previous Parquet export; the CSV is rewritten from the
+result. A manifest next to the export lists the included proposals, a
+checksum of their source rows and the content version of the proposal
+catalog and municipal changes (a change there forces a full export):
+    python scripts/export_data.py --incremental
 """
 
 import sqlite3
 import pandas as pd
+import numpy as np
 from pathlib import Path
 import logging
 from datetime import datetime
 import sys
+import csv
+import os
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+from db_version import data_version
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+OUTPUT_CSV = Path('data/voting_results_export.csv')
+OUTPUT_PARQUET = Path('data/voting_results_export.parquet')
+OUTPUT_PARQUET_LONG = Path('data/voting_results_export_long.parquet')
+PARQUET_COMPRESSION = 'zstd'
+MANIFEST_PATH = Path('data/voting_results_export.manifest.json')
+
+# Tables the exported rows depend on beyond voting_results: the municipality
+# level maps results through v_stable_municipality_mapping (municipal_changes)
+SOURCE_TABLES = ('votings', 'proposals', 'municipal_changes')
+
+# Parallel exports repeated when the database changed while the workers read it
+MAX_EXPORT_ATTEMPTS = 3
+
+# Rows fetched from the cursor at a time in streaming mode
+STREAM_FETCH_SIZE = 10_000
 
 def setup_logging():
     """Setup logging configuration"""
@@ -55,194 +102,508 @@ def get_all_proposals(conn, logger):
 
     return df
 
-def export_municipalities(conn, logger):
-    """Export municipalities with current structure"""
-    logger.info("Exporting municipalities with current structure...")
+# One query per geographic level: (geo_id, geo_name, proposal_id, ja, nein, pct) for all proposals
+EXPORT_LEVELS = {
+    # Analysis municipalities (corrected for mergers/splits)
+    'municipality': """
+    SELECT
+        municipality_id AS geo_id,
+        municipality_name AS geo_name,
+        proposal_id,
+        ja_stimmen_absolut,
+        nein_stimmen_absolut,
+        ja_prozent
+    FROM v_voting_results_analysis
+    """,
+    'district': """
+    SELECT
+        geo_id,
+        geo_name,
+        proposal_id,
+        ja_stimmen_absolut,
+        nein_stimmen_absolut,
+        ROUND(100.0 * ja_stimmen_absolut / NULLIF(gueltige_stimmen, 0), 2) as ja_prozent
+    FROM voting_results
+    WHERE geo_level = 'district'
+    """,
+    'canton': """
+    SELECT
+        geo_id,
+        geo_name,
+        proposal_id,
+        ja_stimmen_absolut,
+        nein_stimmen_absolut,
+        ROUND(100.0 * ja_stimmen_absolut / NULLIF(gueltige_stimmen, 0), 2) as ja_prozent
+    FROM voting_results
+    WHERE geo_level = 'canton'
+    """,
+}
 
-    # Get all proposals
-    proposals_df = get_all_proposals(conn, logger)
+VALUE_COLUMNS = ['ja_stimmen_absolut', 'nein_stimmen_absolut', 'ja_prozent']
+VALUE_SUFFIXES = ['ja', 'nein', 'pct']
 
-    # Get unique analysis municipalities (corrected for mergers/splits)
-    query = """
-    SELECT DISTINCT
-        municipality_id,
-        municipality_name
-    FROM v_voting_results_analysis
-    ORDER BY municipality_name
-    """
 
-    municipalities = pd.read_sql_query(query, conn)
-    logger.info(f"Found {len(municipalities)} current municipalities")
+def proposal_columns(proposal_ids):
+    """Column names {id}_ja, {id}_nein, {id}_pct in proposal order."""
+    return [f'{proposal_id}_{suffix}' for proposal_id in proposal_ids for suffix in VALUE_SUFFIXES]
+
 
-    # Create base dataframe
-    result_df = pd.DataFrame({
-        'geo_type': 'municipality',
-        'geo_id': municipalities['municipality_id'],
-        'geo_name': municipalities['municipality_name']
+def pivot_level(data, geo_type, proposal_ids, units=None):
+    """
+    Pivot long results of one level into the wide export layout.
+
+    The values are scattered into a preallocated (geo x proposal x 3) array
+    in one step; rows are the distinct (geo_id, geo_name) pairs ordered by
+    name (or the given `units`), columns follow the proposal order.
+    """
+    if units is None:
+        units = data[['geo_id', 'geo_name']].drop_duplicates().sort_values('geo_name', kind='stable')
+    geo_ids = pd.unique(units['geo_id'])
+
+    geo_idx = pd.Index(geo_ids).get_indexer(data['geo_id'])
+    proposal_idx = pd.Index(proposal_ids).get_indexer(data['proposal_id'])
+    known = proposal_idx >= 0
+
+    values = np.full((len(geo_ids), len(proposal_ids), len(VALUE_COLUMNS)), np.nan)
+    values[geo_idx[known], proposal_idx[known]] = data.loc[known, VALUE_COLUMNS].to_numpy(dtype=float)
+
+    # A unit listed under several names gets the same values on every row
+    flat = values[pd.Index(geo_ids).get_indexer(units['geo_id'])].reshape(len(units), len(proposal_ids) * len(VALUE_COLUMNS))
+
+    columns = {
+        'geo_type': geo_type,
+        'geo_id': units['geo_id'].to_numpy(),
+        'geo_name': units['geo_name'].to_numpy(),
+    }
+    for j, col in enumerate(proposal_columns(proposal_ids)):
+        if col.endswith('_pct'):
+            columns[col] = flat[:, j]
+        else:
+            # Vote counts stay integers, missing results become <NA>
+            columns[col] = pd.array(np.round(flat[:, j]), dtype='Int64')
+    return pd.DataFrame(columns)
+
+
+def load_level(conn, geo_type, proposal_ids=None):
+    """Load the long results of one geographic level (optionally only some proposals) with a single query"""
+    if proposal_ids is None:
+        return pd.read_sql_query(EXPORT_LEVELS[geo_type], conn)
+
+    placeholders = ', '.join('?' * len(proposal_ids))
+    query = f"SELECT * FROM ({EXPORT_LEVELS[geo_type]}) WHERE proposal_id IN ({placeholders})"
+    return pd.read_sql_query(query, conn, params=[int(proposal_id) for proposal_id in proposal_ids])
+
+
+def sort_long(df, proposal_ids):
+    """Order long rows by unit, then proposal order; drops unknown proposals."""
+    order = pd.Index(proposal_ids).get_indexer(df['proposal_id'])
+    # Numeric ids sort as numbers whether they come as text (districts) or integers
+    geo_key = pd.to_numeric(df['geo_id'], errors='coerce')
+    if geo_key.isna().any():
+        geo_key = df['geo_id'].astype(str)
+    df = df.assign(geo_key=geo_key, proposal_order=order)
+    df = df[df['proposal_order'] >= 0].sort_values(['geo_key', 'proposal_order'], kind='stable')
+    return df.drop(columns=['geo_key', 'proposal_order']).reset_index(drop=True)
+
+
+def long_level(data, geo_type, proposal_ids):
+    """Long layout (geo_type, geo_id, proposal_id, ja, nein, pct) of one level."""
+    data = sort_long(data, proposal_ids)
+
+    return pd.DataFrame({
+        'geo_type': geo_type,
+        'geo_id': data['geo_id'].to_numpy(),
+        'proposal_id': data['proposal_id'].to_numpy(),
+        'ja': pd.array(data['ja_stimmen_absolut'].to_numpy(dtype=float).round(), dtype='Int64'),
+        'nein': pd.array(data['nein_stimmen_absolut'].to_numpy(dtype=float).round(), dtype='Int64'),
+        'pct': data['ja_prozent'].to_numpy(dtype=float),
     })
 
-    # For each proposal, add 3 columns
-    for _, proposal in proposals_df.iterrows():
-        proposal_id = proposal['proposal_id']
-
-        # Get data for this proposal
-        query = f"""
-        SELECT
-            municipality_id,
-            ja_stimmen_absolut,
-            nein_stimmen_absolut,
-            ja_prozent
-        FROM v_voting_results_analysis
-        WHERE proposal_id = {proposal_id}
-        """
-
-        proposal_data = pd.read_sql_query(query, conn)
-
-        # Merge with result dataframe
-        result_df = result_df.merge(
-            proposal_data,
-            left_on='geo_id',
-            right_on='municipality_id',
-            how='left'
-        )
-
-        # Rename columns
-        result_df = result_df.rename(columns={
-            'ja_stimmen_absolut': f'{proposal_id}_ja',
-            'nein_stimmen_absolut': f'{proposal_id}_nein',
-            'ja_prozent': f'{proposal_id}_pct'
-        })
-
-        # Drop the extra municipality_id column
-        if 'municipality_id' in result_df.columns:
-            result_df = result_df.drop('municipality_id', axis=1)
-
-    logger.info(f"Created municipality export with {len(result_df)} rows and {len(result_df.columns)} columns")
+
+def export_level(conn, logger, geo_type, proposals_df=None):
+    """Export one geographic level with a single query and a vectorized pivot"""
+    logger.info(f"Exporting {geo_type} level...")
+
+    if proposals_df is None:
+        proposals_df = get_all_proposals(conn, logger)
+
+    data = load_level(conn, geo_type)
+    result_df = pivot_level(data, geo_type, proposals_df['proposal_id'].tolist())
+
+    logger.info(f"Created {geo_type} export with {len(result_df)} rows and {len(result_df.columns)} columns")
     return result_df
 
-def export_districts(conn, logger):
-    """Export districts"""
-    logger.info("Exporting districts...")
 
-    # Get all proposals
-    proposals_df = get_all_proposals(conn, logger)
+def parquet_frame(df):
+    """Column types for Parquet: geo_type as categorical, geo_id numeric where possible."""
+    df = df.copy()
+    df['geo_type'] = pd.Categorical(df['geo_type'], categories=list(EXPORT_LEVELS))
+    geo_id = pd.to_numeric(df['geo_id'], errors='coerce')
+    if geo_id.notna().all():
+        df['geo_id'] = geo_id.astype('int64')
+    else:
+        df['geo_id'] = df['geo_id'].astype(str)
+    return df
 
-    # Get unique districts
-    query = """
-    SELECT DISTINCT
-        geo_id,
-        geo_name
-    FROM voting_results
-    WHERE geo_level = 'district'
-    ORDER BY geo_name
+
+def write_parquet(frames, output_path, logger, row_group_per_frame=True):
+    """
+    Write the frames (one per geographic level) to one Parquet file.
+
+    With row_group_per_frame every level becomes its own row group. The wide
+    layout has ~670 columns, where each extra row group adds a column chunk per
+    column and roughly doubles the read time, so it is written as one group.
     """
+    if pa is None:
+        logger.warning(f"pyarrow not installed, skipping {output_path}")
+        return None
 
-    districts = pd.read_sql_query(query, conn)
-    logger.info(f"Found {len(districts)} districts")
+    frames = [parquet_frame(df) for df in frames if len(df) > 0]
+    if not frames:
+        return None
 
-    # Create base dataframe
-    result_df = pd.DataFrame({
-        'geo_type': 'district',
-        'geo_id': districts['geo_id'],
-        'geo_name': districts['geo_name']
-    })
+    # geo_id must have one type across all row groups
+    if any(df['geo_id'].dtype == object for df in frames):
+        for df in frames:
+            df['geo_id'] = df['geo_id'].astype(str)
+
+    tables = [pa.Table.from_pandas(df, preserve_index=False) for df in frames]
+    schema = tables[0].schema
+    tables = [table.cast(schema) for table in tables]
+    if not row_group_per_frame:
+        tables = [pa.concat_tables(tables)]
+
+    with pq.ParquetWriter(output_path, schema, compression=PARQUET_COMPRESSION,
+                          use_dictionary=['geo_type', 'geo_name']) as writer:
+        for table in tables:
+            writer.write_table(table, row_group_size=max(len(table), 1))
+
+    logger.info(f"Saved {output_path} ({sum(len(df) for df in frames)} rows, {len(tables)} row groups)")
+    return output_path
+
+
+def export_municipalities(conn, logger, proposals_df=None):
+    """Export municipalities with current structure"""
+    return export_level(conn, logger, 'municipality', proposals_df)
 
-    # For each proposal, add 3 columns
-    for _, proposal in proposals_df.iterrows():
-        proposal_id = proposal['proposal_id']
-
-        # Get data for this proposal
-        query = f"""
-        SELECT
-            geo_id,
-            ja_stimmen_absolut,
-            nein_stimmen_absolut,
-            ROUND(100.0 * ja_stimmen_absolut / NULLIF(gueltige_stimmen, 0), 2) as ja_prozent
-        FROM voting_results
-        WHERE proposal_id = {proposal_id}
-        AND geo_level = 'district'
-        """
-
-        proposal_data = pd.read_sql_query(query, conn)
-
-        # Merge with result dataframe
-        result_df = result_df.merge(
-            proposal_data,
-            on='geo_id',
-            how='left'
-        )
-
-        # Rename columns
-        result_df = result_df.rename(columns={
-            'ja_stimmen_absolut': f'{proposal_id}_ja',
-            'nein_stimmen_absolut': f'{proposal_id}_nein',
-            'ja_prozent': f'{proposal_id}_pct'
-        })
-
-    logger.info(f"Created district export with {len(result_df)} rows and {len(result_df.columns)} columns")
-    return result_df
 
-def export_cantons(conn, logger):
+def export_districts(conn, logger, proposals_df=None):
+    """Export districts"""
+    return export_level(conn, logger, 'district', proposals_df)
+
+
+def export_cantons(conn, logger, proposals_df=None):
     """Export cantons"""
-    logger.info("Exporting cantons...")
+    return export_level(conn, logger, 'canton', proposals_df)
 
-    # Get all proposals
-    proposals_df = get_all_proposals(conn, logger)
+def csv_count(value):
+    """Vote count as CSV text ('' for missing)."""
+    return '' if value is None else str(int(round(value)))
 
-    # Get unique cantons
-    query = """
-    SELECT DISTINCT
-        geo_id,
-        geo_name
+
+def csv_pct(value):
+    """Percentage as CSV text ('' for missing), formatted like to_csv."""
+    return '' if value is None else repr(float(value))
+
+
+def stream_level(conn, geo_type, proposal_ids):
+    """
+    Yield the wide export rows of one level, one geo unit at a time.
+
+    The results of the level go to an indexed TEMP table (kept by SQLite, not
+    in Python) and are read back per unit name, ordered like pivot_level()
+    rows, so only the current output row is held in memory. A unit reported
+    under several names yields one row per name, each with all results of
+    the unit.
+    """
+    position = {proposal_id: i for i, proposal_id in enumerate(proposal_ids)}
+    table = f'export_{geo_type}'
+    conn.execute(f"DROP TABLE IF EXISTS temp.{table}")
+    conn.execute(f"CREATE TEMP TABLE {table} AS {EXPORT_LEVELS[geo_type]}")
+    conn.execute(f"CREATE INDEX temp.idx_{table}_geo_id ON {table}(geo_id)")
+
+    cursor = conn.execute(f"""
+    SELECT
+        u.geo_id,
+        u.geo_name,
+        r.proposal_id,
+        r.ja_stimmen_absolut,
+        r.nein_stimmen_absolut,
+        r.ja_prozent
+    FROM (SELECT DISTINCT geo_id, geo_name FROM {table}) u
+    INNER JOIN {table} r ON r.geo_id = u.geo_id
+    ORDER BY u.geo_name, u.geo_id
+    """)
+
+    try:
+        current, row = None, None
+        while True:
+            batch = cursor.fetchmany(STREAM_FETCH_SIZE)
+            if not batch:
+                break
+            for geo_id, geo_name, proposal_id, ja, nein, pct in batch:
+                if (geo_id, geo_name) != current:
+                    if row is not None:
+                        yield row
+                    current = (geo_id, geo_name)
+                    row = [geo_type, geo_id, geo_name] + [''] * (len(VALUE_SUFFIXES) * len(proposal_ids))
+
+                i = position.get(proposal_id)
+                if i is not None:
+                    start = 3 + len(VALUE_SUFFIXES) * i
+                    row[start:start + 3] = [csv_count(ja), csv_count(nein), csv_pct(pct)]
+
+        if row is not None:
+            yield row
+    finally:
+        cursor.close()
+        conn.execute(f"DROP TABLE IF EXISTS temp.{table}")
+
+
+def export_csv_streaming(conn, logger, output_path=None):
+    """Write the CSV export row by row with constant memory; returns rows per level"""
+    output_path = output_path or OUTPUT_CSV
+    proposal_ids = get_all_proposals(conn, logger)['proposal_id'].tolist()
+    header = ['geo_type', 'geo_id', 'geo_name'] + proposal_columns(proposal_ids)
+
+    row_counts = {}
+    logger.info(f"Streaming to {output_path}...")
+    with open(output_path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f, lineterminator=os.linesep)
+        writer.writerow(header)
+        for geo_type in EXPORT_LEVELS:
+            logger.info(f"Streaming {geo_type} level...")
+            row_counts[geo_type] = 0
+            for row in stream_level(conn, geo_type, proposal_ids):
+                writer.writerow(row)
+                row_counts[geo_type] += 1
+
+    logger.info(f"  Total rows: {sum(row_counts.values())}")
+    logger.info(f"  Total columns: {len(header)}")
+    for geo_type, count in row_counts.items():
+        logger.info(f"  {geo_type}: {count}")
+    logger.info(f"  Output file: {output_path}")
+    return row_counts
+
+
+def write_outputs(wide_frames, long_frames, logger):
+    """Write the CSV and both Parquet files from the per-level frames"""
+    logger.info("Combining all geographic levels...")
+    combined_df = pd.concat(wide_frames.values(), ignore_index=True)
+
+    # Save to CSV
+    logger.info(f"Saving to {OUTPUT_CSV}...")
+    combined_df.to_csv(OUTPUT_CSV, index=False, encoding='utf-8-sig')
+
+    # Typed columnar copies (wide and long)
+    write_parquet(wide_frames.values(), OUTPUT_PARQUET, logger, row_group_per_frame=False)
+    write_parquet(long_frames.values(), OUTPUT_PARQUET_LONG, logger)
+
+    logger.info(f"\nExport complete!")
+    logger.info(f"  Total rows: {len(combined_df)}")
+    logger.info(f"  Total columns: {len(combined_df.columns)}")
+    for geo_type, df in wide_frames.items():
+        logger.info(f"  {geo_type}: {len(df)}")
+    logger.info(f"  Output file: {OUTPUT_CSV}")
+
+
+def proposal_fingerprints(conn):
+    """
+    Checksum of the source rows of every proposal, from SQL aggregates.
+
+    Row counts and plain and BFS-weighted vote sums per level change whenever
+    a result is added, corrected or moved to another unit.
+    """
+    df = pd.read_sql_query("""
+    SELECT
+        proposal_id,
+        geo_level,
+        COUNT(*) as n,
+        TOTAL(ja_stimmen_absolut) as ja,
+        TOTAL(nein_stimmen_absolut) as nein,
+        TOTAL(gueltige_stimmen) as gueltig,
+        TOTAL(CAST(geo_id AS INTEGER) * ja_stimmen_absolut) as ja_weighted,
+        TOTAL(CAST(geo_id AS INTEGER) * nein_stimmen_absolut) as nein_weighted
     FROM voting_results
-    WHERE geo_level = 'canton'
-    ORDER BY geo_name
+    GROUP BY proposal_id, geo_level
+    ORDER BY proposal_id, geo_level
+    """, conn)
+
+    fingerprints = {}
+    for proposal_id, group in df.groupby('proposal_id', sort=False):
+        payload = group.drop(columns='proposal_id').to_csv(index=False)
+        fingerprints[str(proposal_id)] = hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+    return fingerprints
+
+
+def load_manifest():
+    """Return the manifest of the previous export, or None."""
+    if not MANIFEST_PATH.exists():
+        return None
+    with open(MANIFEST_PATH, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(proposal_ids, fingerprints, source_version):
+    """Record the exported proposals, their source checksums and the version of SOURCE_TABLES."""
+    manifest = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'source_version': source_version,
+        'proposal_ids': [int(proposal_id) for proposal_id in proposal_ids],
+        'fingerprints': {str(proposal_id): fingerprints.get(str(proposal_id)) for proposal_id in proposal_ids},
+    }
+    with open(MANIFEST_PATH, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def unit_keys(units):
+    """Set of (geo_id, geo_name) pairs, ids compared as text."""
+    return set(zip(units['geo_id'].astype(str), units['geo_name']))
+
+
+def match_geo_id(series, like):
+    """Cast geo ids from the database to the type used in the existing export."""
+    if pd.api.types.is_numeric_dtype(like):
+        return pd.to_numeric(series).astype(like.dtype)
+    return series.astype(str)
+
+
+def export_level_worker(db_path, geo_type, proposal_ids):
+    """Export one level in a worker process over a read-only connection; returns (wide, long)"""
+    conn = sqlite3.connect(f'file:{Path(db_path).resolve()}?mode=ro', uri=True)
+    try:
+        data = load_level(conn, geo_type)
+    finally:
+        conn.close()
+    return pivot_level(data, geo_type, proposal_ids), long_level(data, geo_type, proposal_ids)
+
+
+def export_levels_parallel(db_path, logger, proposal_ids, max_workers=None):
     """
+    Export all levels of EXPORT_LEVELS concurrently, one worker process per level.
 
-    cantons = pd.read_sql_query(query, conn)
-    logger.info(f"Found {len(cantons)} cantons")
+    The proposal catalog is computed once by the caller and passed to every
+    worker. Each worker opens its own read-only connection, so the levels
+    could see different committed states if an import writes meanwhile: the
+    content version of the source tables is compared before and after the
+    pool and the export repeated (up to MAX_EXPORT_ATTEMPTS times) if it moved.
+    """
+    max_workers = max_workers or len(EXPORT_LEVELS)
+    tables = ('voting_results',) + SOURCE_TABLES
+    conn = sqlite3.connect(f'file:{Path(db_path).resolve()}?mode=ro', uri=True)
+    try:
+        for attempt in range(1, MAX_EXPORT_ATTEMPTS + 1):
+            logger.info(f"Exporting {len(EXPORT_LEVELS)} levels with {max_workers} worker processes...")
+            version = data_version(conn, tables)
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                futures = {
+                    geo_type: pool.submit(export_level_worker, db_path, geo_type, proposal_ids)
+                    for geo_type in EXPORT_LEVELS
+                }
+                results = {geo_type: future.result() for geo_type, future in futures.items()}
+            if data_version(conn, tables) == version:
+                break
+            logger.warning(f"Database changed during export (attempt {attempt}/{MAX_EXPORT_ATTEMPTS})")
+        else:
+            raise RuntimeError(f"Database kept changing during {MAX_EXPORT_ATTEMPTS} export attempts")
+    finally:
+        conn.close()
 
-    # Create base dataframe
-    result_df = pd.DataFrame({
-        'geo_type': 'canton',
-        'geo_id': cantons['geo_id'],
-        'geo_name': cantons['geo_name']
-    })
+    wide_frames = {geo_type: wide for geo_type, (wide, _) in results.items()}
+    long_frames = {geo_type: long for geo_type, (_, long) in results.items()}
+    return wide_frames, long_frames
+
+
+def export_full(conn, logger, proposals_df=None, fingerprints=None, db_path=None, source_version=None):
+    """
+    Export all levels and proposals (one query per level) and write the manifest.
+
+    With `db_path` the levels are exported in parallel worker processes,
+    otherwise one after another on `conn`.
+    """
+    if proposals_df is None:
+        proposals_df = get_all_proposals(conn, logger)
+    proposal_ids = proposals_df['proposal_id'].tolist()
+
+    if db_path is not None:
+        wide_frames, long_frames = export_levels_parallel(db_path, logger, proposal_ids)
+    else:
+        wide_frames, long_frames = {}, {}
+        for geo_type in EXPORT_LEVELS:
+            logger.info(f"Exporting {geo_type} level...")
+            data = load_level(conn, geo_type)
+            wide_frames[geo_type] = pivot_level(data, geo_type, proposal_ids)
+            long_frames[geo_type] = long_level(data, geo_type, proposal_ids)
+
+    write_outputs(wide_frames, long_frames, logger)
+    save_manifest(proposal_ids, fingerprints or proposal_fingerprints(conn),
+                  source_version or data_version(conn, SOURCE_TABLES))
+    return wide_frames
+
+
+def export_incremental(conn, logger, db_path=None):
+    """
+    Splice new or changed proposals into the previous export.
+
+    Proposals whose checksum matches the manifest keep their columns from the
+    previous Parquet files; only the others are queried. Falls back to a full
+    export when there is no previous export, SOURCE_TABLES changed (e.g. a
+    corrected merger remaps municipality rows of every proposal) or the set of
+    geo units changed.
+    """
+    proposals_df = get_all_proposals(conn, logger)
+    proposal_ids = proposals_df['proposal_id'].tolist()
+    fingerprints = proposal_fingerprints(conn)
+    source_version = data_version(conn, SOURCE_TABLES)
+    manifest = load_manifest()
+
+    if pa is None or manifest is None or not (OUTPUT_PARQUET.exists() and OUTPUT_PARQUET_LONG.exists()):
+        logger.info("No previous columnar export found, running full export")
+        return export_full(conn, logger, proposals_df, fingerprints, db_path, source_version)
+
+    if manifest.get('source_version') != source_version:
+        logger.info("Proposal catalog or municipal changes changed, running full export")
+        return export_full(conn, logger, proposals_df, fingerprints, db_path, source_version)
+
+    wide = pd.read_parquet(OUTPUT_PARQUET)
+    wide['geo_type'] = wide['geo_type'].astype(str)
+    for geo_type in EXPORT_LEVELS:
+        units = pd.read_sql_query(f"SELECT DISTINCT geo_id, geo_name FROM ({EXPORT_LEVELS[geo_type]})", conn)
+        if unit_keys(wide[wide['geo_type'] == geo_type]) != unit_keys(units):
+            logger.info(f"Geo units of level {geo_type} changed, running full export")
+            return export_full(conn, logger, proposals_df, fingerprints, db_path, source_version)
+
+    previous = manifest['fingerprints']
+    changed = [pid for pid in proposal_ids if previous.get(str(pid)) != fingerprints.get(str(pid))]
+    removed = [pid for pid in manifest['proposal_ids'] if pid not in set(proposal_ids)]
+    if not changed and not removed and manifest['proposal_ids'] == proposal_ids:
+        logger.info("Export is up to date")
+        return None
+
+    logger.info(f"Updating {len(changed)} new or changed proposals, removing {len(removed)}")
+    stale_columns = set(proposal_columns(changed + removed))
+    long = pd.read_parquet(OUTPUT_PARQUET_LONG)
+    long['geo_type'] = long['geo_type'].astype(str)
+    long = long[~long['proposal_id'].isin(changed + removed)]
+
+    wide_frames, long_frames = {}, {}
+    for geo_type in EXPORT_LEVELS:
+        rows = wide[wide['geo_type'] == geo_type].reset_index(drop=True)
+        data = load_level(conn, geo_type, changed)
+        data['geo_id'] = match_geo_id(data['geo_id'], rows['geo_id'])
+
+        fresh = pivot_level(data, geo_type, changed, units=rows[['geo_id', 'geo_name']])
+        kept = rows.drop(columns=[col for col in rows.columns if col in stale_columns])
+        level_wide = pd.concat([kept, fresh.drop(columns=['geo_type', 'geo_id', 'geo_name'])], axis=1)
+        wide_frames[geo_type] = level_wide[['geo_type', 'geo_id', 'geo_name'] + proposal_columns(proposal_ids)]
+
+        level_long = pd.concat([long[long['geo_type'] == geo_type], long_level(data, geo_type, changed)])
+        long_frames[geo_type] = sort_long(level_long, proposal_ids)
+
+    write_outputs(wide_frames, long_frames, logger)
+    save_manifest(proposal_ids, fingerprints, source_version)
+    return wide_frames
 
-    # For each proposal, add 3 columns
-    for _, proposal in proposals_df.iterrows():
-        proposal_id = proposal['proposal_id']
-
-        # Get data for this proposal
-        query = f"""
-        SELECT
-            geo_id,
-            ja_stimmen_absolut,
-            nein_stimmen_absolut,
-            ROUND(100.0 * ja_stimmen_absolut / NULLIF(gueltige_stimmen, 0), 2) as ja_prozent
-        FROM voting_results
-        WHERE proposal_id = {proposal_id}
-        AND geo_level = 'canton'
-        """
-
-        proposal_data = pd.read_sql_query(query, conn)
-
-        # Merge with result dataframe
-        result_df = result_df.merge(
-            proposal_data,
-            on='geo_id',
-            how='left'
-        )
-
-        # Rename columns
-        result_df = result_df.rename(columns={
-            'ja_stimmen_absolut': f'{proposal_id}_ja',
-            'nein_stimmen_absolut': f'{proposal_id}_nein',
-            'ja_prozent': f'{proposal_id}_pct'
-        })
-
-    logger.info(f"Created canton export with {len(result_df)} rows and {len(result_df.columns)} columns")
-    return result_df
 
 def main():
     """Main function"""
@@ -264,31 +625,12 @@ def main():
         logger.info(f"Connecting to database: {db_path}")
         conn = sqlite3.connect(db_path)
 
-        # Export each level
-        municipalities_df = export_municipalities(conn, logger)
-        districts_df = export_districts(conn, logger)
-        cantons_df = export_cantons(conn, logger)
-
-        # Combine all levels
-        logger.info("Combining all geographic levels...")
-        combined_df = pd.concat([
-            municipalities_df,
-            districts_df,
-            cantons_df
-        ], ignore_index=True)
-
-        # Save to CSV
-        output_path = Path('data/voting_results_export.csv')
-        logger.info(f"Saving to {output_path}...")
-        combined_df.to_csv(output_path, index=False, encoding='utf-8-sig')
-
-        logger.info(f"\nExport complete!")
-        logger.info(f"  Total rows: {len(combined_df)}")
-        logger.info(f"  Total columns: {len(combined_df.columns)}")
-        logger.info(f"  Municipalities: {len(municipalities_df)}")
-        logger.info(f"  Districts: {len(districts_df)}")
-        logger.info(f"  Cantons: {len(cantons_df)}")
-        logger.info(f"  Output file: {output_path}")
+        if '--stream' in sys.argv:
+            export_csv_streaming(conn, logger)
+        elif '--incremental' in sys.argv:
+            export_incremental(conn, logger, db_path)
+        else:
+            export_full(conn, logger, db_path=db_path)
 
         # Close connection
         conn.close()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Aggregation rules for municipality feature columns.
+
+When municipalities merge, the features of the predecessors have to be combined
+into one row for the fusion municipality. Every feature column is registered in
+AGGREGATION_RULES with the rule that reproduces the value of the merged unit:
+
+- SUM: counts and areas (einwohner, beschaeftigte_*, flaeche_total_ha, ...)
+- weighted mean: shares and rates, weighted by the base they refer to
+  (POPULATION, TAXPAYERS, AREA, HOUSEHOLDS)
+- ratio(): values recomputed from their summed components (e.g. density)
+
+aggregate_features() applies all rules in one vectorized pass. Adding a feature
+only requires a new entry in AGGREGATION_RULES.
+"""
+
+import numpy as np
+import pandas as pd
+import logging
+
+from import_continuous_features import INDICATOR_NAMES
+
+logger = logging.getLogger(__name__)
+
+# Rule types
+SUM = ('sum',)
+POPULATION = ('weighted', 'einwohner')
+TAXPAYERS = ('weighted', 'steuerpflichtige_total')
+AREA = ('weighted', 'flaeche_total_ha')
+HOUSEHOLDS = ('weighted', 'privathaushalte')
+
+
+def ratio(numerator, denominator, factor=1):
+    """Rule that recomputes a column as factor * sum(numerator) / sum(denominator)."""
+    return ('ratio', numerator, denominator, factor)
+
+
+# Regionalportraets indicators (see import_continuous_features.INDICATOR_NAMES)
+AGGREGATION_RULES = {
+    'einwohner': SUM,
+    'einwohner_veraenderung_pct': POPULATION,
+    'bevoelkerungsdichte': ratio('einwohner', 'flaeche_total_ha', 100),  # per km², area in ha
+    'anteil_0_19_jahre': POPULATION,
+    'anteil_20_64_jahre': POPULATION,
+    'anteil_65_plus_jahre': POPULATION,
+    'auslaenderanteil': POPULATION,
+    'heiratsziffer': POPULATION,
+    'scheidungsziffer': POPULATION,
+    'geburtenziffer': POPULATION,
+    'sterbeziffer': POPULATION,
+    'privathaushalte': SUM,
+    'haushaltsgroesse': HOUSEHOLDS,
+    'flaeche_total_ha': SUM,
+    'siedlungsflaeche_pct': AREA,
+    'siedlungsflaeche_veraenderung': AREA,
+    'landwirtschaftsflaeche_pct': AREA,
+    'landwirtschaftsflaeche_veraenderung': AREA,
+    'wald_pct': AREA,
+    'unproduktive_flaeche_pct': AREA,
+    'beschaeftigte_total': SUM,
+    'beschaeftigte_sektor1': SUM,
+    'beschaeftigte_sektor2': SUM,
+    'beschaeftigte_sektor3': SUM,
+    'arbeitsstaetten_total': SUM,
+    'arbeitsstaetten_sektor1': SUM,
+    'arbeitsstaetten_sektor2': SUM,
+    'arbeitsstaetten_sektor3': SUM,
+    'leerwohnungsziffer': HOUSEHOLDS,  # households as proxy for the dwelling stock
+    'neue_wohnungen': POPULATION,
+    'sozialhilfequote': POPULATION,
+    'waehleranteil_fdp': POPULATION,
+    'waehleranteil_cvp': POPULATION,
+    'waehleranteil_sp': POPULATION,
+    'waehleranteil_svp': POPULATION,
+    'waehleranteil_evp_csp': POPULATION,
+    'waehleranteil_glp': POPULATION,
+    'waehleranteil_bdp': POPULATION,
+    'waehleranteil_gps': POPULATION,
+    'waehleranteil_andere': POPULATION,
+    'waehleranteil_klein': POPULATION,
+}
+
+# ESTV income (see import_estv_income.py)
+AGGREGATION_RULES.update({
+    'steuerbares_einkommen_total': SUM,
+    'steuerpflichtige_total': SUM,
+    'steuerbares_einkommen_pro_kopf': ratio('steuerbares_einkommen_total', 'steuerpflichtige_total'),
+    'pct_einkommen_ueber_100k': TAXPAYERS,
+    'pct_einkommen_unter_40k': TAXPAYERS,
+})
+AGGREGATION_RULES.update({
+    f'pct_klasse_{klasse}': TAXPAYERS
+    for klasse in ['1_30k', '30k_40k', '40k_50k', '50k_75k', '75k_100k',
+                   '100k_200k', '200k_500k', '500k_1m', '1m_plus']
+})
+
+UNREGISTERED_INDICATORS = [name for name in INDICATOR_NAMES.values() if name not in AGGREGATION_RULES]
+if UNREGISTERED_INDICATORS:
+    logger.warning(f"Indicators without aggregation rule: {UNREGISTERED_INDICATORS}")
+
+
+def aggregate_features(frame, key, rules=AGGREGATION_RULES):
+    """
+    Aggregate the rows of `frame` that share the same `key` according to `rules`.
+
+    All rules are evaluated on one combined block of columns that is summed with a
+    single groupby. Weighted means and ratios only use rows where both the value
+    and its weight (or numerator and denominator) are present. Columns without a
+    rule are returned as NaN with a warning.
+
+    Returns a DataFrame indexed by the key values with the columns of `frame`.
+    """
+    columns = list(frame.columns)
+    n_rows = len(frame)
+    blocks = {}
+
+    def values(col):
+        if col not in frame.columns:
+            return np.full(n_rows, np.nan)
+        return pd.to_numeric(frame[col], errors='coerce').to_numpy(dtype=float)
+
+    unregistered = []
+    for col in columns:
+        rule = rules.get(col)
+        if rule is None:
+            unregistered.append(col)
+            continue
+
+        if rule[0] == 'sum':
+            x = values(col)
+            present = ~np.isnan(x)
+            blocks[(col, 'num')] = np.where(present, x, 0.0)
+            blocks[(col, 'den')] = present.astype(float)
+        elif rule[0] == 'weighted':
+            x, w = values(col), values(rule[1])
+            present = ~np.isnan(x) & ~np.isnan(w)
+            blocks[(col, 'num')] = np.where(present, x * w, 0.0)
+            blocks[(col, 'den')] = np.where(present, w, 0.0)
+        elif rule[0] == 'ratio':
+            num, den = values(rule[1]), values(rule[2])
+            present = ~np.isnan(num) & ~np.isnan(den)
+            blocks[(col, 'num')] = np.where(present, num * rule[3], 0.0)
+            blocks[(col, 'den')] = np.where(present, den, 0.0)
+        else:
+            raise ValueError(f"Unknown aggregation rule for {col}: {rule}")
+
+    if unregistered:
+        logger.warning(f"No aggregation rule for columns {unregistered}, leaving them empty")
+
+    # One grouped sum over all numerators and denominators
+    block_df = pd.DataFrame(blocks, index=frame.index)
+    sums = block_df.groupby(np.asarray(key)).sum()
+
+    result = pd.DataFrame(index=sums.index, columns=columns, dtype=float)
+    for col in columns:
+        if (col, 'num') not in blocks:
+            continue
+        num, den = sums[(col, 'num')], sums[(col, 'den')]
+        if rules[col][0] == 'sum':
+            # den counts the non-null predecessors
+            result[col] = num.where(den > 0)
+        else:
+            result[col] = (num / den).where(den > 0)
+
+    result.index.name = getattr(key, 'name', None)
+    return result
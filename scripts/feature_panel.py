@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Time-matched lookup of Regionalportraets indicators.
+
+municipality_feature_panel (written by import_continuous_features.py) holds
+every period of every indicator in long format. attach_asof_features() adds,
+for each (municipality, voting_date) row, the value from the closest period
+whose reference year is not after the voting year, so a 2002 vote is explained
+with the data available around 2002 instead of 2019.
+
+The lookup is vectorized: the panel is scattered into a dense
+(municipality x indicator x period) cube, forward-filled along the period
+axis, and all rows are gathered with one fancy-indexing step.
+"""
+
+import sqlite3
+import pandas as pd
+import numpy as np
+from pathlib import Path
+
+DB_PATH = Path(__file__).parent.parent / 'data' / 'processed' / 'swiss_votings.db'
+
+
+def load_feature_panel(conn=None, indicators=None):
+    """Load (bfs_nr, indicator, period_year, value) rows from municipality_feature_panel."""
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH)
+
+    query = "SELECT bfs_nr, indicator, period_year, value FROM municipality_feature_panel"
+    params = []
+    if indicators is not None:
+        query += f" WHERE indicator IN ({', '.join('?' * len(indicators))})"
+        params = list(indicators)
+    panel = pd.read_sql_query(query, conn, params=params)
+
+    if own_conn:
+        conn.close()
+    return panel
+
+
+def vote_years(voting_dates):
+    """Year of voting dates given as YYYYMMDD or YYYY-MM-DD (strings or integers)."""
+    return pd.to_numeric(pd.Series(voting_dates).astype(str).str[:4]).to_numpy()
+
+
+def asof_matrix(bfs_nr, years, panel, indicators=None):
+    """
+    Return an (n_rows x n_indicators) array of as-of values and the indicator list.
+
+    For each row, every indicator takes the value of the latest period_year
+    <= year that has data for that municipality; NaN if there is none.
+    """
+    if indicators is None:
+        indicators = sorted(panel['indicator'].unique())
+    panel = panel[panel['indicator'].isin(indicators)]
+
+    munis = pd.Index(np.unique(panel['bfs_nr']))
+    period_years = np.unique(panel['period_year'])
+    ind_index = pd.Index(indicators)
+
+    # Dense cube, first value wins if an indicator has several periods ending in the same year
+    panel = panel.drop_duplicates(subset=['bfs_nr', 'indicator', 'period_year'], keep='first')
+    m = munis.get_indexer(panel['bfs_nr'])
+    k = ind_index.get_indexer(panel['indicator'])
+    t = np.searchsorted(period_years, panel['period_year'])
+    cube = np.full((len(munis), len(indicators), len(period_years)), np.nan)
+    cube[m, k, t] = panel['value'].to_numpy(dtype=float)
+
+    # Forward fill along the period axis: index of the latest available period
+    available = np.where(~np.isnan(cube), np.arange(len(period_years)), -1)
+    latest = np.maximum.accumulate(available, axis=2)
+
+    # Gather all rows at once
+    row_m = munis.get_indexer(np.asarray(bfs_nr))
+    row_t = np.searchsorted(period_years, np.asarray(years), side='right') - 1
+    valid = (row_m >= 0) & (row_t >= 0)
+
+    result = np.full((len(row_m), len(indicators)), np.nan)
+    vm, vt = row_m[valid], row_t[valid]
+    src_t = latest[vm, :, vt]
+    values = cube[vm[:, None], np.arange(len(indicators))[None, :], np.maximum(src_t, 0)]
+    result[valid] = np.where(src_t >= 0, values, np.nan)
+    return result, list(indicators)
+
+
+def attach_asof_features(df, panel, bfs_col='municipality_id', date_col='voting_date', indicators=None):
+    """Return a copy of df with one column per indicator, matched to each row's voting date."""
+    values, indicators = asof_matrix(
+        pd.to_numeric(df[bfs_col]).to_numpy(), vote_years(df[date_col]), panel, indicators
+    )
+    features = pd.DataFrame(values, columns=indicators, index=df.index)
+    return pd.concat([df, features], axis=1)
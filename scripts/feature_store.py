@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Memory-mapped store for the complete municipality feature matrix.
+
+Build step (run after create_complete_features_view.py, which calls it too):
+    python scripts/feature_store.py
+
+Writes to data/processed/feature_store/:
+- features.npy: float32 matrix (municipalities x features), column-major so
+  every feature is one contiguous block
+- bfs_index.npy: BFS numbers in the row order of the matrix
+- columns.json: column dictionary, municipality names and build metadata
+
+Loading maps the files read-only instead of querying SQLite, so it takes
+milliseconds and parallel worker processes share the same pages:
+    from feature_store import load_features
+    df = load_features(['einwohner', 'auslaenderanteil'])
+"""
+
+import sqlite3
+import pandas as pd
+import numpy as np
+from pathlib import Path
+from datetime import datetime
+import json
+import shutil
+import logging
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).parent.parent / 'data'
+DB_PATH = DATA_DIR / 'processed' / 'swiss_votings.db'
+STORE_DIR = DATA_DIR / 'processed' / 'feature_store'
+SOURCE_TABLE = 'municipality_features_complete'
+
+
+def build_feature_store(db_path=DB_PATH, store_dir=STORE_DIR, table=SOURCE_TABLE):
+    """Write the numeric columns of `table` as a float32 memory-mappable matrix."""
+    conn = sqlite3.connect(db_path)
+    df = pd.read_sql_query(f"SELECT * FROM {table}", conn)
+    conn.close()
+
+    df = df.drop_duplicates(subset='bfs_nr').sort_values('bfs_nr').reset_index(drop=True)
+    feature_cols = [col for col in df.select_dtypes(include='number').columns if col != 'bfs_nr']
+
+    # Build into a temp dir and swap it in, so readers never see a half-written store
+    store_dir = Path(store_dir)
+    tmp_dir = store_dir.with_name(store_dir.name + '.tmp')
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    matrix = np.lib.format.open_memmap(
+        tmp_dir / 'features.npy', mode='w+', dtype=np.float32,
+        shape=(len(df), len(feature_cols)), fortran_order=True
+    )
+    for j, col in enumerate(feature_cols):
+        matrix[:, j] = df[col].to_numpy(dtype=np.float32, na_value=np.nan)
+    matrix.flush()
+    del matrix
+
+    np.save(tmp_dir / 'bfs_index.npy', df['bfs_nr'].to_numpy(dtype=np.int32))
+
+    meta = {
+        'source_table': table,
+        'built_at': datetime.now().isoformat(timespec='seconds'),
+        'n_municipalities': len(df),
+        'columns': feature_cols,
+        'gemeindename': df['gemeindename'].tolist() if 'gemeindename' in df.columns else None,
+    }
+    with open(tmp_dir / 'columns.json', 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=1)
+
+    shutil.rmtree(store_dir, ignore_errors=True)
+    tmp_dir.rename(store_dir)
+
+    logger.info(f"Feature store written to {store_dir}: {len(df)} municipalities x {len(feature_cols)} features")
+    return store_dir
+
+
+def load_store(store_dir=STORE_DIR):
+    """Map the store read-only. Returns (matrix, bfs_index, meta) without copying."""
+    store_dir = Path(store_dir)
+    matrix = np.load(store_dir / 'features.npy', mmap_mode='r')
+    bfs_index = np.load(store_dir / 'bfs_index.npy', mmap_mode='r')
+    with open(store_dir / 'columns.json', encoding='utf-8') as f:
+        meta = json.load(f)
+    return matrix, bfs_index, meta
+
+
+def load_features(columns=None, as_frame=True, store_dir=STORE_DIR):
+    """
+    Load features from the store.
+
+    as_frame=True returns a DataFrame indexed by bfs_nr whose columns are views
+    on the mapped file. as_frame=False returns (matrix, bfs_index, columns);
+    the matrix is a view when all columns or a run of adjacent columns are
+    requested, otherwise the selected columns are copied. An empty selection
+    gives an (n x 0) frame or matrix.
+    """
+    matrix, bfs_index, meta = load_store(store_dir)
+    all_columns = meta['columns']
+    position = {col: j for j, col in enumerate(all_columns)}
+
+    if columns is None:
+        columns = all_columns
+    missing = [col for col in columns if col not in position]
+    if missing:
+        raise KeyError(f"Columns not in feature store: {missing}")
+    idx = [position[col] for col in columns]
+
+    index = pd.Index(bfs_index, name='bfs_nr')
+    if as_frame:
+        data = {col: matrix[:, j] for col, j in zip(columns, idx)}
+        return pd.DataFrame(data, index=index, copy=False)
+
+    start = idx[0] if idx else 0
+    if idx == list(range(start, start + len(idx))):
+        sub = matrix[:, start:start + len(idx)]
+    else:
+        sub = matrix[:, idx]
+    return sub, bfs_index, list(columns)
+
+
+def main():
+    build_feature_store()
+    df = load_features()
+    print("\n" + "="*60)
+    print("FEATURE STORE - SUMMARY")
+    print("="*60)
+    print(f"Location: {STORE_DIR}")
+    print(f"Municipalities: {len(df)}")
+    print(f"Features: {len(df.columns)}")
+    print("="*60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Cache-aware, parallel figure rendering.
+
+A figure task is a render function (data, **params) -> matplotlib Figure plus
+its output path. build_figures() keys every task on a hash of its input data,
+parameters, savefig/rc settings and the render function's source, and skips
+tasks whose PNG exists with an unchanged key (recorded in
+data/cache/figures/manifest.json). The remaining figures are rendered in a
+process pool, so a rebuild after one new voting day only re-renders the
+plots of the new proposals.
+
+Render functions must be module-level so worker processes can unpickle them.
+
+Per-proposal EDA histograms and boxplots (1_EDA/Votings/histograms, boxplots):
+    python scripts/figure_build.py [--force] [--jobs N]
+"""
+
+import sqlite3
+import pandas as pd
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # Headless backend
+import matplotlib.pyplot as plt
+import seaborn as sns
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+import hashlib
+import inspect
+import json
+import os
+import sys
+import logging
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = PROJECT_DIR / 'data' / 'processed' / 'swiss_votings.db'
+MANIFEST_PATH = PROJECT_DIR / 'data' / 'cache' / 'figures' / 'manifest.json'
+EDA_OUTPUT_DIR = PROJECT_DIR / '1_EDA' / 'Votings'
+
+# Style of the EDA notebook (sns.set_theme(style="whitegrid") plus its rcParams)
+EDA_RC = {
+    **sns.plotting_context('notebook'),
+    **sns.axes_style('whitegrid'),
+    'figure.figsize': (10, 6),
+    'font.size': 11,
+    'axes.titlesize': 12,
+    'axes.labelsize': 11,
+}
+EDA_SAVEFIG = {'dpi': 100, 'facecolor': 'white'}
+
+
+def figure_task(path, render, data=None, params=None, savefig=None, rc=None):
+    """One figure: render(data, **params) saved to path with savefig(**savefig) under rc."""
+    return {
+        'path': Path(path),
+        'render': render,
+        'data': data,
+        'params': params or {},
+        'savefig': savefig or {},
+        'rc': rc or {},
+    }
+
+
+def _update_digest(digest, value):
+    """Feed frames, arrays, containers and scalars into a hash."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        columns = list(value.columns) if isinstance(value, pd.DataFrame) else [value.name]
+        digest.update(json.dumps([str(col) for col in columns]).encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(f'{value.dtype}{value.shape}'.encode('utf-8'))
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        for key in sorted(value, key=str):
+            digest.update(str(key).encode('utf-8'))
+            _update_digest(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(f'{type(value).__name__}{len(value)}'.encode('utf-8'))
+        for item in value:
+            _update_digest(digest, item)
+    else:
+        digest.update(json.dumps(value, default=str).encode('utf-8'))
+
+
+def task_key(task):
+    """Hash of everything that determines the figure's pixels."""
+    digest = hashlib.sha256()
+    render = task['render']
+    digest.update(f'{render.__module__}.{render.__qualname__}'.encode('utf-8'))
+    digest.update(inspect.getsource(render).encode('utf-8'))
+    for part in ('data', 'params', 'savefig', 'rc'):
+        _update_digest(digest, task[part])
+    return digest.hexdigest()[:32]
+
+
+def manifest_entry(path):
+    """Manifest key of an output path (relative to the project when inside it)."""
+    path = Path(path).resolve()
+    try:
+        return str(path.relative_to(PROJECT_DIR))
+    except ValueError:
+        return str(path)
+
+
+def load_manifest(manifest_path=MANIFEST_PATH):
+    """Return {output path: task key} of the last build."""
+    manifest_path = Path(manifest_path)
+    if not manifest_path.exists():
+        return {}
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, manifest_path=MANIFEST_PATH):
+    """Write the manifest via a temp file."""
+    manifest_path = Path(manifest_path)
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = manifest_path.with_suffix('.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    tmp_path.replace(manifest_path)
+
+
+def render_task(task):
+    """Render one figure to its path (written to a temp file and swapped in)."""
+    path = task['path']
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f'{path.stem}.tmp{path.suffix}')
+
+    with plt.rc_context(task['rc']):
+        fig = task['render'](task['data'], **task['params'])
+        fig.savefig(tmp_path, **task['savefig'])
+    plt.close(fig)
+    tmp_path.replace(path)
+    return str(path)
+
+
+def build_figures(tasks, n_jobs=None, force=False, manifest_path=MANIFEST_PATH):
+    """
+    Render the tasks whose output is missing or whose key changed.
+
+    Returns {'rendered': [...], 'skipped': [...]} with the output paths.
+    n_jobs=1 renders in this process. The manifest records every figure that
+    rendered even if another task fails; the first error is raised after
+    the remaining tasks finished.
+    """
+    manifest = load_manifest(manifest_path)
+    keys = [task_key(task) for task in tasks]
+
+    pending, skipped = [], []
+    for task, key in zip(tasks, keys):
+        entry = manifest_entry(task['path'])
+        if not force and manifest.get(entry) == key and task['path'].exists():
+            skipped.append(str(task['path']))
+        else:
+            pending.append((task, entry, key))
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    logger.info(f"{len(pending)} figures to render, {len(skipped)} unchanged ({n_jobs} workers)")
+
+    rendered, errors = [], []
+    try:
+        if n_jobs == 1 or len(pending) <= 1:
+            for task, entry, key in pending:
+                try:
+                    rendered.append(render_task(task))
+                except Exception as error:
+                    logger.error(f"Rendering {task['path']} failed: {error!r}")
+                    errors.append(error)
+                    continue
+                manifest[entry] = key
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                futures = {executor.submit(render_task, task): (task, entry, key) for task, entry, key in pending}
+                for future in as_completed(futures):
+                    task, entry, key = futures[future]
+                    error = future.exception()
+                    if error is not None:
+                        logger.error(f"Rendering {task['path']} failed: {error!r}")
+                        errors.append(error)
+                        continue
+                    rendered.append(future.result())
+                    manifest[entry] = key
+    finally:
+        # Keep the figures that did render even when a task failed
+        if rendered:
+            save_manifest(manifest, manifest_path)
+
+    if errors:
+        raise errors[0]
+    return {'rendered': rendered, 'skipped': skipped}
+
+
+# --- EDA figures per proposal ---
+
+def short_title(title, length=50):
+    """Title cut to `length` characters like in the EDA notebook."""
+    return title[:length] + '...' if len(title) > length else title
+
+
+def proposal_histogram(values, title, date):
+    """Histogram of ja_prozent over the municipalities of one proposal."""
+    fig, ax = plt.subplots(figsize=(9, 5))
+
+    sns.histplot(values, bins=30, color='steelblue', edgecolor='white', alpha=0.8, ax=ax)
+
+    ax.axvline(values.mean(), color='#e74c3c', linestyle='--', linewidth=2,
+               label=f'Mean: {values.mean():.1f}%')
+    ax.axvline(np.median(values), color='#27ae60', linestyle='--', linewidth=2,
+               label=f'Median: {np.median(values):.1f}%')
+    ax.axvline(50, color='#f39c12', linestyle='-', linewidth=2, alpha=0.6,
+               label='50% Schwelle')
+
+    ax.set_xlabel('Ja-Anteil (%)')
+    ax.set_ylabel('Anzahl Gemeinden')
+    ax.set_title(f'{date}: {title}', fontweight='bold')
+    ax.legend(loc='upper right', framealpha=0.9)
+    ax.set_xlim(0, 100)
+
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+
+    fig.tight_layout()
+    return fig
+
+
+def proposal_boxplot(values, title, date):
+    """Horizontal boxplot of ja_prozent over the municipalities of one proposal."""
+    fig, ax = plt.subplots(figsize=(9, 3.5))
+
+    sns.boxplot(x=values, color='steelblue', width=0.5, ax=ax,
+                flierprops={'marker': 'o', 'markersize': 4, 'alpha': 0.5})
+
+    ax.axvline(50, color='#f39c12', linestyle='-', linewidth=2, alpha=0.6)
+    ax.set_xlabel('Ja-Anteil (%)')
+    ax.set_title(f'{date}: {title}', fontweight='bold')
+    ax.set_xlim(0, 100)
+
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    ax.spines['left'].set_visible(False)
+    ax.set_yticks([])
+
+    fig.tight_layout()
+    return fig
+
+
+PROPOSAL_FIGURES = {
+    'hist': (proposal_histogram, 'histograms'),
+    'box': (proposal_boxplot, 'boxplots'),
+}
+
+
+def proposal_figure_tasks(df, proposals, output_dir=EDA_OUTPUT_DIR, kinds=('hist', 'box')):
+    """
+    Tasks for the per-proposal figures (hist_001.png, box_001.png, ...).
+
+    df holds proposal_id and ja_prozent per municipality, proposals one row
+    per proposal with proposal_id, title_de and voting_date.
+    """
+    values = {
+        proposal_id: group.to_numpy(dtype=float)
+        for proposal_id, group in df.dropna(subset=['ja_prozent']).groupby('proposal_id')['ja_prozent']
+    }
+
+    tasks = []
+    for kind in kinds:
+        render, subdir = PROPOSAL_FIGURES[kind]
+        for row in proposals.itertuples():
+            tasks.append(figure_task(
+                Path(output_dir) / subdir / f'{kind}_{row.proposal_id:03d}.png', render,
+                data=values.get(row.proposal_id, np.array([])),
+                params={'title': short_title(row.title_de), 'date': row.voting_date},
+                savefig=EDA_SAVEFIG, rc=EDA_RC,
+            ))
+    return tasks
+
+
+def load_eda_votes(db_path=DB_PATH):
+    """Vote shares and proposals as loaded by 1a_voting_eda.ipynb."""
+    conn = sqlite3.connect(db_path)
+    df = pd.read_sql_query("""
+        SELECT proposal_id, voting_date, title_de, municipality_id, ja_prozent
+        FROM v_voting_results_analysis
+        WHERE municipality_id < 9000  -- Exclude expat votes
+        ORDER BY voting_date, proposal_id
+    """, conn)
+    conn.close()
+
+    proposals = df.groupby('proposal_id').agg({'voting_date': 'first', 'title_de': 'first'}).reset_index()
+    return df, proposals.sort_values('voting_date')
+
+
+def main():
+    force = '--force' in sys.argv
+    n_jobs = int(sys.argv[sys.argv.index('--jobs') + 1]) if '--jobs' in sys.argv else None
+
+    df, proposals = load_eda_votes()
+    logger.info(f"Loaded {len(df):,} records of {len(proposals)} proposals")
+
+    result = build_figures(proposal_figure_tasks(df, proposals), n_jobs=n_jobs, force=force)
+    logger.info(f"Rendered {len(result['rendered'])} figures, {len(result['skipped'])} unchanged")
+    return result
+
+
+if __name__ == '__main__':
+    main()
@@ -18,6 +18,8 @@ import logging
 import sys
 from tqdm import tqdm
 
+from excel_cache import read_excel_cached
+
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
@@ -234,7 +236,7 @@ def import_municipal_changes(conn, logger):
     try:
         # Read Excel with proper header handling
         logger.info(f"Reading Excel: {EXCEL_PATH}")
-        df = pd.read_excel(EXCEL_PATH, sheet_name='Daten', header=1)
+        df = read_excel_cached(EXCEL_PATH, sheet_name='Daten', header=1)
         logger.info(f"Read {len(df)} rows from Excel")
 
         # Rename columns
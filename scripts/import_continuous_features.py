@@ -2,7 +2,9 @@
 """
 Import continuous municipality features from BFS Regionalportraets 2021.
 
-Creates table 'municipality_continuous_features' with pivot data for all municipalities.
+Creates table 'municipality_continuous_features' with pivot data for all municipalities
+and table 'municipality_feature_panel' with all periods in long format
+(bfs_nr, indicator, period, period_year, value).
 
 Indicators:
 - Ind_01_01: Einwohner (Population)
@@ -25,6 +27,9 @@ import sqlite3
 import pandas as pd
 from pathlib import Path
 import logging
+import sys
+import time
+import tracemalloc
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -35,6 +40,15 @@ DATA_DIR = Path(__file__).parent.parent / 'data'
 CSV_PATH = DATA_DIR / 'raw' / 'features' / 'regionalportraets_2021_master.csv'
 DB_PATH = DATA_DIR / 'processed' / 'swiss_votings.db'
 
+# Columns read from the master CSV and rows per streamed chunk
+CSV_COLUMNS = ['CODE_REGION', 'REGION', 'INDICATORS', 'PERIOD_REF', 'VALUE']
+CHUNK_SIZE = 200_000
+
+# Use 2019 as the main reference year (most complete); area data uses a different period
+MAIN_PERIOD = '2019'
+AREA_PERIOD = '2004/2009'
+AREA_INDICATORS = ['Ind_04_01', 'Ind_04_02', 'Ind_04_04', 'Ind_04_06', 'Ind_04_07']
+
 # Indicator mapping (code -> readable name)
 INDICATOR_NAMES = {
     'Ind_01_01': 'einwohner',
@@ -126,37 +140,120 @@ INDICATOR_DESCRIPTIONS = {
 }
 
 
+def read_master_chunks(periods=None, chunksize=CHUNK_SIZE):
+    """
+    Stream the master CSV and yield only municipality rows of known indicators.
+
+    Codes are read as categoricals; INDICATORS (and PERIOD_REF when `periods`
+    is given) use fixed categories so unwanted rows become NaN while parsing
+    and are dropped before the chunk is kept.
+    """
+    dtype = {
+        'CODE_REGION': 'category',
+        'REGION': 'category',
+        'INDICATORS': pd.CategoricalDtype(list(INDICATOR_NAMES)),
+        'PERIOD_REF': pd.CategoricalDtype(periods) if periods is not None else 'category',
+        'VALUE': 'float64',
+    }
+    reader = pd.read_csv(CSV_PATH, sep=';', encoding='utf-8-sig', usecols=CSV_COLUMNS,
+                         dtype=dtype, chunksize=chunksize)
+    for chunk in reader:
+        chunk = chunk.dropna(subset=['INDICATORS', 'PERIOD_REF'])
+        # Exclude CH (national level) and keep only municipality codes
+        chunk = chunk[chunk['CODE_REGION'].astype(str).str.isnumeric()]
+        if len(chunk) > 0:
+            yield chunk
+
+
 def load_and_transform_data():
-    """Load CSV and pivot to wide format."""
-    logger.info(f"Loading data from {CSV_PATH}")
+    """Stream the master CSV and pivot the 2019 (and area 2004/2009) values to wide format."""
+    logger.info(f"Streaming data from {CSV_PATH}")
+
+    # Keep the first row per (municipality, indicator); 2019 wins over the area period.
+    # Only the selected rows of each chunk are kept and combined once at the end.
+    key = ['CODE_REGION', 'INDICATORS']
+    recent_parts, area_parts = [], []
+    for chunk in read_master_chunks(periods=[MAIN_PERIOD, AREA_PERIOD]):
+        chunk = chunk.astype({'CODE_REGION': str, 'REGION': str, 'INDICATORS': str, 'PERIOD_REF': str})
+        recent = chunk[chunk['PERIOD_REF'] == MAIN_PERIOD]
+        area = chunk[(chunk['PERIOD_REF'] == AREA_PERIOD) & chunk['INDICATORS'].isin(AREA_INDICATORS)]
+        recent_parts.append(recent.drop_duplicates(subset=key, keep='first'))
+        area_parts.append(area.drop_duplicates(subset=key, keep='first'))
+
+    if not recent_parts:
+        logger.warning("No matching rows in the master CSV")
+        return pd.DataFrame(columns=['bfs_nr', 'gemeindename', *sorted(INDICATOR_NAMES.values())])
+
+    df_combined = pd.concat(recent_parts + area_parts).drop_duplicates(subset=key, keep='first')
+    logger.info(f"After filtering: {len(df_combined)} rows")
 
-    df = pd.read_csv(CSV_PATH, sep=';', encoding='utf-8-sig', low_memory=False)
-    logger.info(f"Loaded {len(df)} rows")
+    return pivot_indicators(df_combined)
 
-    # Filter to most recent year for each indicator
-    # Use 2019 as the main reference year (most complete)
-    df_recent = df[df['PERIOD_REF'] == '2019'].copy()
 
-    # Also get area data which uses different period
-    df_area = df[df['PERIOD_REF'] == '2004/2009'].copy()
-    df_area = df_area[df_area['INDICATORS'].isin(['Ind_04_01', 'Ind_04_02', 'Ind_04_04', 'Ind_04_06', 'Ind_04_07'])]
+def load_and_transform_data_full():
+    """Previous loader: read the whole CSV, then filter. Kept for --benchmark."""
+    df = pd.read_csv(CSV_PATH, sep=';', encoding='utf-8-sig', low_memory=False)
 
-    # Get voter data (2019 National Council elections)
-    df_voters = df[df['PERIOD_REF'] == '2019'].copy()
+    df_recent = df[df['PERIOD_REF'] == MAIN_PERIOD].copy()
+    df_area = df[df['PERIOD_REF'] == AREA_PERIOD].copy()
+    df_area = df_area[df_area['INDICATORS'].isin(AREA_INDICATORS)]
+    df_voters = df[df['PERIOD_REF'] == MAIN_PERIOD].copy()
     df_voters = df_voters[df_voters['INDICATORS'].str.startswith('Ind_14')]
 
-    # Combine
     df_combined = pd.concat([df_recent, df_area, df_voters]).drop_duplicates(
         subset=['CODE_REGION', 'INDICATORS'], keep='first'
     )
-
-    # Exclude CH (national level) and keep only municipality codes
     df_combined = df_combined[df_combined['CODE_REGION'] != 'CH']
     df_combined = df_combined[df_combined['CODE_REGION'].str.isnumeric()]
 
-    logger.info(f"After filtering: {len(df_combined)} rows")
-
+    return pivot_indicators(df_combined)
+
+
+def load_panel_data():
+    """
+    Stream all periods of the master CSV into long format.
+
+    Returns one row per (bfs_nr, indicator, period) with the numeric
+    period_year (last year of ranges like '2004/2009') for as-of lookups.
+    """
+    logger.info(f"Streaming all periods from {CSV_PATH}")
+
+    key = ['bfs_nr', 'indicator', 'period']
+    parts = []
+    for chunk in read_master_chunks():
+        parts.append(pd.DataFrame({
+            'bfs_nr': chunk['CODE_REGION'].astype(str).astype(int),
+            'indicator': chunk['INDICATORS'].map(INDICATOR_NAMES).astype(str),
+            'period': chunk['PERIOD_REF'].astype(str),
+            'value': chunk['VALUE'],
+        }).dropna(subset=['value']))
+
+    if not parts:
+        logger.warning("No panel rows in the master CSV")
+        return pd.DataFrame(columns=['bfs_nr', 'indicator', 'period', 'period_year', 'value'])
+    panel = pd.concat(parts, ignore_index=True).drop_duplicates(subset=key, keep='first')
+
+    # Last four-digit year of the period label; labels without a year are dropped
+    periods = pd.Series(panel['period'].unique())
+    years = periods.str.extract(r'(\d{4})(?!.*\d{4})', expand=False)
+    unparseable = periods[years.isna()].tolist()
+    if unparseable:
+        logger.warning(f"Dropping periods without a year: {unparseable}")
+    period_years = dict(zip(periods[years.notna()], years.dropna().astype(int)))
+    panel = panel[panel['period'].isin(period_years)].copy()
+    panel['period_year'] = panel['period'].map(period_years).astype(int)
+
+    panel = panel[['bfs_nr', 'indicator', 'period', 'period_year', 'value']]
+    panel = panel.sort_values(['indicator', 'bfs_nr', 'period_year']).reset_index(drop=True)
+    logger.info(f"Panel: {len(panel)} values, {panel['indicator'].nunique()} indicators, "
+                f"{panel['period'].nunique()} periods")
+    return panel
+
+
+def pivot_indicators(df_combined):
+    """Pivot (CODE_REGION, REGION, INDICATORS, VALUE) rows to one row per municipality."""
     # Rename indicators to readable names
+    df_combined = df_combined.copy()
     df_combined['indicator_name'] = df_combined['INDICATORS'].map(INDICATOR_NAMES)
 
     # Pivot to wide format
@@ -182,6 +279,37 @@ def load_and_transform_data():
     return df_pivot
 
 
+def measure(func):
+    """Run func and return (result, seconds, peak traced memory in MB)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1024**2
+
+
+def benchmark():
+    """Compare the full-read loader with the streaming loader."""
+    before, t_before, mem_before = measure(load_and_transform_data_full)
+    after, t_after, mem_after = measure(load_and_transform_data)
+
+    pd.testing.assert_frame_equal(
+        before.sort_values('bfs_nr').reset_index(drop=True),
+        after.sort_values('bfs_nr').reset_index(drop=True),
+        check_dtype=False
+    )
+
+    print("\n" + "="*60)
+    print("LOAD BENCHMARK - Regionalportraets master CSV")
+    print("="*60)
+    print(f"Full read:  {t_before:6.2f} s, peak {mem_before:8.1f} MB")
+    print(f"Streaming:  {t_after:6.2f} s, peak {mem_after:8.1f} MB")
+    print("Results identical: yes")
+    print("="*60)
+
+
 def create_labels_table():
     """Create dataframe for feature labels."""
     labels = []
@@ -220,6 +348,30 @@ def import_to_sqlite(df, labels_df):
     logger.info("Import completed successfully")
 
 
+def import_panel_to_sqlite(panel):
+    """Import the long multi-period panel to SQLite."""
+    conn = sqlite3.connect(DB_PATH)
+
+    conn.execute("DROP TABLE IF EXISTS municipality_feature_panel")
+    conn.execute("""
+        CREATE TABLE municipality_feature_panel (
+            bfs_nr INTEGER NOT NULL,
+            indicator TEXT NOT NULL,
+            period TEXT NOT NULL,
+            period_year INTEGER NOT NULL,
+            value REAL,
+            PRIMARY KEY (bfs_nr, indicator, period)
+        )
+    """)
+    panel.to_sql('municipality_feature_panel', conn, index=False, if_exists='append')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_panel_indicator ON municipality_feature_panel(indicator, period_year)")
+
+    conn.commit()
+    conn.close()
+
+    logger.info(f"Imported {len(panel)} values to municipality_feature_panel")
+
+
 def print_summary(df):
     """Print summary statistics."""
     print("\n" + "="*60)
@@ -238,13 +390,23 @@ def print_summary(df):
 
 
 def main():
+    if '--benchmark' in sys.argv:
+        benchmark()
+        return None
+
     # Load and transform
+    start = time.perf_counter()
     df = load_and_transform_data()
+    logger.info(f"Loaded in {time.perf_counter() - start:.2f} s")
     labels_df = create_labels_table()
 
     # Import to SQLite
     import_to_sqlite(df, labels_df)
 
+    # All periods in long format (see feature_panel.py for time-matched lookups)
+    panel = load_panel_data()
+    import_panel_to_sqlite(panel)
+
     # Print summary
     print_summary(df)
 
@@ -11,6 +11,8 @@ import pandas as pd
 from pathlib import Path
 import logging
 
+from excel_cache import read_excel_cached
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -25,10 +27,10 @@ def load_estv_data():
     logger.info(f"Loading ESTV data from {XLSX_PATH}")
 
     # Sheet 511: Number of taxpayers by income class
-    df_taxpayers = pd.read_excel(XLSX_PATH, sheet_name='511', header=2)
+    df_taxpayers = read_excel_cached(XLSX_PATH, sheet_name='511', header=2)
 
     # Sheet 512: Taxable income by income class
-    df_income = pd.read_excel(XLSX_PATH, sheet_name='512', header=2)
+    df_income = read_excel_cached(XLSX_PATH, sheet_name='512', header=2)
 
     # Clean column names
     df_taxpayers.columns = ['kanton_id', 'kanton', 'bfs_nr', 'gemeinde',
@@ -12,6 +12,8 @@ import logging
 import json
 import sys
 
+from excel_cache import read_excel_cached
+
 # Setup logging
 def setup_logging():
     """Setup logging configuration"""
@@ -38,7 +40,7 @@ def read_excel_with_validation(excel_path, logger):
 
     try:
         # Read Excel with proper header handling (skip first row, use second as header)
-        df = pd.read_excel(excel_path, sheet_name='Daten', header=1)
+        df = read_excel_cached(excel_path, sheet_name='Daten', header=1)
         logger.info(f"Successfully read Excel. Shape: {df.shape}")
 
         # Log column names for debugging
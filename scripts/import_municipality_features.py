@@ -17,6 +17,8 @@ from pathlib import Path
 import logging
 from datetime import datetime
 
+from excel_cache import read_excel_cached, read_excel_sheets_cached
+
 # Setup logging
 log_dir = Path('logs')
 log_dir.mkdir(exist_ok=True)
@@ -70,12 +72,12 @@ FEATURE_TO_LABEL_SHEET = {
 }
 
 
-def load_municipality_data(xlsx: pd.ExcelFile) -> pd.DataFrame:
+def load_municipality_data(excel_path: Path) -> pd.DataFrame:
     """Load municipality data from 'Daten' sheet."""
     logger.info("Loading municipality data from 'Daten' sheet...")
 
     # Header is in row 2 (index 1), skip row 3 (links)
-    df = pd.read_excel(xlsx, sheet_name='Daten', header=1, skiprows=[2])
+    df = read_excel_cached(excel_path, sheet_name='Daten', header=1, skiprows=[2])
 
     # Rename columns for cleaner database storage
     column_mapping = {
@@ -113,15 +115,21 @@ def load_municipality_data(xlsx: pd.ExcelFile) -> pd.DataFrame:
     return df, clean_names
 
 
-def load_label_mappings(xlsx: pd.ExcelFile) -> dict:
+def load_label_mappings(excel_path: Path) -> dict:
     """Load label mappings from all label sheets."""
     logger.info("Loading label mappings...")
 
     all_labels = {}
 
+    # Aliases like 'MS Regionen.1' share a sheet; each sheet is parsed once, in one workbook pass
+    sheets = read_excel_sheets_cached(excel_path, FEATURE_TO_LABEL_SHEET.values())
+
     for feature_name, sheet_name in FEATURE_TO_LABEL_SHEET.items():
+        if sheet_name not in sheets:
+            logger.warning(f"Could not load labels for {feature_name}: sheet {sheet_name} not found")
+            continue
         try:
-            df = pd.read_excel(xlsx, sheet_name=sheet_name)
+            df = sheets[sheet_name]
 
             # The structure is: first column = Code (with header in row 1), second column = Label
             # Row 0 has column names, row 1+ has data
@@ -301,13 +309,10 @@ def main():
         logger.error(f"Database not found: {DB_FILE}")
         return
 
-    # Load Excel file
+    # Load Excel file (parsed sheets are cached until the workbook changes)
     logger.info(f"Loading Excel file: {EXCEL_FILE}")
-    xlsx = pd.ExcelFile(EXCEL_FILE)
-
-    # Load data
-    df, clean_names = load_municipality_data(xlsx)
-    labels = load_label_mappings(xlsx)
+    df, clean_names = load_municipality_data(EXCEL_FILE)
+    labels = load_label_mappings(EXCEL_FILE)
 
     # Connect to database
     logger.info(f"Connecting to database: {DB_FILE}")
@@ -0,0 +1,49 @@
+"""Studentized range distribution of 5_ANOVA/anova_posthoc.py against scipy."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / '5_ANOVA'))
+from anova_posthoc import posthoc, studentized_range_ppf, studentized_range_sf
+
+
+@pytest.mark.parametrize('k', [2, 4, 7])
+def test_ppf_matches_scipy(k):
+    df = np.array([0.8, 1.05, 1.5, 1.99, 2.01, 3.3, 12, 250])
+    expected = [stats.studentized_range.ppf(0.95, k, value) for value in df]
+    np.testing.assert_allclose(studentized_range_ppf(0.95, k, df), expected, rtol=1e-6)
+
+
+@pytest.mark.parametrize('df', [0.8, 1.05, 1.5, 5.0])
+def test_sf_matches_scipy_at_low_df(df):
+    q = np.array([1.0, 5.0, 20.0])
+    expected = stats.studentized_range.sf(q, 4, df)
+    np.testing.assert_allclose(studentized_range_sf(q, 4, df), expected, atol=1e-9)
+
+
+def test_games_howell_interval_for_small_groups():
+    # Two observations per group: Welch df of each pair is close to 1
+    df = pd.DataFrame({
+        'proposal_id': 1,
+        'group': np.repeat([1, 2, 3, 4], 2),
+        'ja_prozent': [40.0, 48.0, 55.0, 57.0, 30.0, 45.0, 61.0, 62.0],
+    })
+    pairs = posthoc(df, 'group', method='games-howell')
+
+    values = df.groupby('group')['ja_prozent']
+    var_n = values.var() / values.size()
+    a, b = pairs['group_a'].to_numpy(), pairs['group_b'].to_numpy()
+    welch_df = (var_n[a].to_numpy() + var_n[b].to_numpy()) ** 2 / (
+        var_n[a].to_numpy() ** 2 + var_n[b].to_numpy() ** 2)
+    se = np.sqrt((var_n[a].to_numpy() + var_n[b].to_numpy()) / 2)
+    assert (welch_df < 2).all()
+
+    half_width = stats.studentized_range.ppf(0.95, 4, welch_df) * se
+    np.testing.assert_allclose(pairs['ci_high'] - pairs['diff'], half_width, rtol=1e-6)
+    expected_p = stats.studentized_range.sf(np.abs(pairs['diff']) / se, 4, welch_df)
+    np.testing.assert_allclose(pairs['p_adj'], expected_p, atol=1e-9)
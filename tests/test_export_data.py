@@ -0,0 +1,171 @@
+"""Streaming, pivot and incremental exports of scripts/export_data.py must agree."""
+
+import sqlite3
+import logging
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+import db_version
+import export_data
+
+LOGGER = logging.getLogger(__name__)
+
+
+def make_db(path):
+    """Three proposals; district 1 is reported as 'Bezirk Alt' and later as 'Bezirk Neu'."""
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+    CREATE TABLE votings (voting_id INTEGER, voting_date TEXT);
+    CREATE TABLE proposals (proposal_id INTEGER, voting_id INTEGER, title_de TEXT);
+    CREATE TABLE voting_results (
+        geo_id TEXT, geo_name TEXT, geo_level TEXT, proposal_id INTEGER,
+        ja_stimmen_absolut INTEGER, nein_stimmen_absolut INTEGER, gueltige_stimmen INTEGER
+    );
+    INSERT INTO votings VALUES (1, '20200209'), (2, '20210307');
+    INSERT INTO proposals VALUES (10, 1, 'Vorlage A'), (11, 1, 'Vorlage B'), (12, 2, 'Vorlage C');
+    CREATE VIEW v_voting_results_analysis AS
+    SELECT
+        CAST(geo_id AS INTEGER) AS municipality_id,
+        geo_name AS municipality_name,
+        proposal_id,
+        ja_stimmen_absolut,
+        nein_stimmen_absolut,
+        ROUND(100.0 * ja_stimmen_absolut / gueltige_stimmen, 2) AS ja_prozent
+    FROM voting_results
+    WHERE geo_level = 'municipality';
+    """)
+    rows = [
+        ('101', 'Aarau', 'municipality', 10, 300, 200, 500),
+        ('101', 'Aarau', 'municipality', 11, 150, 350, 500),
+        ('101', 'Aarau', 'municipality', 12, 220, 180, 400),
+        ('102', 'Baden', 'municipality', 10, 100, 100, 200),
+        ('102', 'Baden', 'municipality', 12, 90, 110, 200),
+        ('1', 'Bezirk Alt', 'district', 10, 400, 300, 700),
+        ('1', 'Bezirk Alt', 'district', 11, 250, 450, 700),
+        ('1', 'Bezirk Neu', 'district', 12, 310, 290, 600),
+        ('2', 'Bezirk Mitte', 'district', 10, 50, 70, 120),
+        ('2', 'Bezirk Mitte', 'district', 11, 60, 60, 120),
+        ('2', 'Bezirk Mitte', 'district', 12, 40, 80, 120),
+        ('19', 'Aargau', 'canton', 10, 450, 370, 820),
+        ('19', 'Aargau', 'canton', 11, 310, 510, 820),
+        ('19', 'Aargau', 'canton', 12, 350, 370, 720),
+    ]
+    conn.executemany("INSERT INTO voting_results VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    return conn
+
+
+def test_streaming_matches_pivot_for_renamed_unit(tmp_path):
+    conn = make_db(tmp_path / 'votes.db')
+    proposals = export_data.get_all_proposals(conn, LOGGER)
+
+    pivot_path = tmp_path / 'pivot.csv'
+    frames = [export_data.export_level(conn, LOGGER, geo_type, proposals) for geo_type in export_data.EXPORT_LEVELS]
+    pd.concat(frames, ignore_index=True).to_csv(pivot_path, index=False, encoding='utf-8-sig')
+
+    stream_path = tmp_path / 'stream.csv'
+    export_data.export_csv_streaming(conn, LOGGER, stream_path)
+    conn.close()
+
+    assert stream_path.read_bytes() == pivot_path.read_bytes()
+
+    # Both names of district 1 carry all three results
+    districts = pd.read_csv(stream_path, encoding='utf-8-sig', dtype={'geo_id': str})
+    renamed = districts[districts['geo_name'].isin(['Bezirk Alt', 'Bezirk Neu'])]
+    assert len(renamed) == 2
+    assert renamed[['10_ja', '11_ja', '12_ja']].notna().all().all()
+
+
+def test_empty_level_exports_empty_frame(tmp_path):
+    conn = make_db(tmp_path / 'votes.db')
+    conn.execute("DELETE FROM voting_results WHERE geo_level = 'district'")
+    conn.commit()
+    proposals = export_data.get_all_proposals(conn, LOGGER)
+
+    districts = export_data.export_level(conn, LOGGER, 'district', proposals)
+    assert len(districts) == 0
+    assert list(districts.columns) == ['geo_type', 'geo_id', 'geo_name'] + export_data.proposal_columns([10, 11, 12])
+
+    pivot_path = tmp_path / 'pivot.csv'
+    frames = [export_data.export_level(conn, LOGGER, geo_type, proposals) for geo_type in export_data.EXPORT_LEVELS]
+    pd.concat(frames, ignore_index=True).to_csv(pivot_path, index=False, encoding='utf-8-sig')
+    stream_path = tmp_path / 'stream.csv'
+    export_data.export_csv_streaming(conn, LOGGER, stream_path)
+    conn.close()
+
+    assert stream_path.read_bytes() == pivot_path.read_bytes()
+
+
+def add_municipal_changes(conn):
+    """Baden (102) merges into Brugg (103); the municipality view follows the merger."""
+    conn.executescript("""
+    CREATE TABLE municipal_changes (old_bfs_number TEXT, new_bfs_number TEXT, new_name TEXT);
+    INSERT INTO municipal_changes VALUES ('102', '103', 'Brugg');
+    INSERT INTO voting_results VALUES ('103', 'Brugg', 'municipality', 10, 70, 30, 100);
+    DROP VIEW v_voting_results_analysis;
+    CREATE VIEW v_voting_results_analysis AS
+    SELECT
+        CAST(COALESCE(mc.new_bfs_number, vr.geo_id) AS INTEGER) AS municipality_id,
+        COALESCE(mc.new_name, vr.geo_name) AS municipality_name,
+        vr.proposal_id,
+        SUM(vr.ja_stimmen_absolut) AS ja_stimmen_absolut,
+        SUM(vr.nein_stimmen_absolut) AS nein_stimmen_absolut,
+        ROUND(100.0 * SUM(vr.ja_stimmen_absolut) / SUM(vr.gueltige_stimmen), 2) AS ja_prozent
+    FROM voting_results vr
+    LEFT JOIN municipal_changes mc ON vr.geo_id = mc.old_bfs_number
+    WHERE vr.geo_level = 'municipality'
+    GROUP BY 1, 2, 3;
+    """)
+    conn.commit()
+
+
+def test_incremental_export_follows_corrected_merger(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'data').mkdir()
+    monkeypatch.setattr(db_version, 'MEMO_PATH', tmp_path / 'memo.json')
+    conn = make_db(tmp_path / 'votes.db')
+    add_municipal_changes(conn)
+
+    export_data.export_full(conn, LOGGER)
+    assert export_data.export_incremental(conn, LOGGER) is None
+
+    # Corrected merger: Baden went to Aarau, not Brugg. voting_results and
+    # the set of units are unchanged, only the mapping differs.
+    conn.execute("UPDATE municipal_changes SET new_bfs_number = '101', new_name = 'Aarau'")
+    conn.commit()
+    assert export_data.export_incremental(conn, LOGGER) is not None
+    incremental = export_data.OUTPUT_CSV.read_bytes()
+
+    export_data.export_full(conn, LOGGER)
+    conn.close()
+    assert incremental == export_data.OUTPUT_CSV.read_bytes()
+
+    export = pd.read_csv(export_data.OUTPUT_CSV, encoding='utf-8-sig')
+    aarau = export[(export['geo_type'] == 'municipality') & (export['geo_id'] == 101)]
+    assert aarau['10_ja'].item() == 400
+
+
+def test_parallel_export_retries_when_database_changes(tmp_path, monkeypatch):
+    db_path = tmp_path / 'votes.db'
+    conn = make_db(db_path)
+    proposal_ids = export_data.get_all_proposals(conn, LOGGER)['proposal_id'].tolist()
+
+    # The version moves between the first two checks, as if an import
+    # committed while the workers were reading
+    checks = []
+
+    def moving_version(conn, tables):
+        checks.append(tables)
+        return {'voting_results': min(len(checks), 2)}
+
+    monkeypatch.setattr(export_data, 'data_version', moving_version)
+    wide_frames, _ = export_data.export_levels_parallel(db_path, LOGGER, proposal_ids, max_workers=2)
+    assert len(checks) == 4
+
+    for geo_type in export_data.EXPORT_LEVELS:
+        expected = export_data.pivot_level(export_data.load_level(conn, geo_type), geo_type, proposal_ids)
+        pd.testing.assert_frame_equal(wide_frames[geo_type], expected)
+    conn.close()